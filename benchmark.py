@@ -0,0 +1,291 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import platform
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tut01"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "tut02"))
+
+import AES
+import RSA
+
+# Headless benchmark suite for tut01/AES.py and tut02/RSA.py. Every operation is
+# timed on its own (KDF, cipher, file I/O, keygen) with warmup runs and repeated
+# perf_counter_ns samples, and reported as median/p95/p99.
+
+AES_SIZES = [2**10, 2**15, 2**20, 2**24, 2**27, 2**30]  # 1KB to 1GB
+RSA_MESSAGE_SIZES = [64, 256, 1024, 2048]
+RSA_BITS = 2048
+RSA_CRT_BITS = [1024, 2048, 4096]
+RSA_KEYGEN_BITS = [2048, 4096]
+RSA_FILE_SIZES = [2**10, 2**15, 2**20, 2**24, 2**27, 2**30]  # 1KB to 1GB
+CHUNKED_MAX_SIZE = 2**20  # RSA-per-chunk mode needs minutes beyond this
+REPEAT = 20
+WARMUP = 3
+KEYGEN_REPEAT = 20
+REGRESSION_THRESHOLD = 0.10  # Fail compare when a median gets more than 10% slower
+
+def measure(function, repeat: int = REPEAT, warmup: int = WARMUP) -> list:
+    """Call function warmup times untimed, then repeat times, returning nanosecond samples."""
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        function()
+        samples.append(time.perf_counter_ns() - start)
+    return samples
+
+def percentile(sorted_samples: list, fraction: float) -> int:
+    """Nearest-rank percentile of already sorted samples."""
+    rank = max(1, -(-len(sorted_samples) * fraction // 1))
+    return sorted_samples[int(rank) - 1]
+
+def summarize(operation: str, size: int, samples: list) -> dict:
+    """Reduce nanosecond samples to one result row."""
+    ordered = sorted(samples)
+    median = percentile(ordered, 0.5)
+    return {
+        "operation": operation,
+        "size": size,
+        "samples": len(ordered),
+        "min_ns": ordered[0],
+        "median_ns": median,
+        "p95_ns": percentile(ordered, 0.95),
+        "p99_ns": percentile(ordered, 0.99),
+        "max_ns": ordered[-1],
+        "mean_ns": sum(ordered) // len(ordered),
+        "mb_per_s": (size / 2**20) / (median / 1e9) if size and median else None,
+    }
+
+def bench_aes(sizes: list, repeat: int, warmup: int) -> list:
+    """Time PBKDF2, in-memory encrypt/decrypt and raw file write/read separately."""
+    password = "testpassword"
+    salt = os.urandom(AES.SALT_LENGTH)
+    results = [summarize("aes_kdf", 0, measure(lambda: AES.pbkdf2(password, salt), repeat, warmup))]
+    key = AES.pbkdf2(password, salt)
+
+    for size in sizes:
+        plaintext = os.urandom(size)
+        blob = bytearray(AES.encrypt_buffer_size(size))
+        blob_length = AES.encrypt_into(plaintext, key, blob)
+        blob_view = memoryview(blob)[:blob_length]
+        decrypted = bytearray(AES.decrypt_buffer_size(blob_length))
+        results.append(summarize("aes_encrypt", size,
+                                 measure(lambda: AES.encrypt_into(plaintext, key, blob), repeat, warmup)))
+        results.append(summarize("aes_decrypt", size,
+                                 measure(lambda: AES.decrypt_into(blob_view, key, decrypted), repeat, warmup)))
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "data.bin")
+
+            def write_file():
+                with open(path, 'wb') as f:
+                    f.write(plaintext)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+            def read_file():
+                with open(path, 'rb') as f:
+                    f.readinto(decrypted)
+
+            results.append(summarize("file_write", size, measure(write_file, repeat, warmup)))
+            results.append(summarize("file_read", size, measure(read_file, repeat, warmup)))
+        del plaintext, blob, blob_view, decrypted
+    return results
+
+def bench_rsa_keygen(bits_list: list, repeat: int, workers: int = None) -> list:
+    """Time RSA key generation; keygen latency varies a lot, so mean and tail are printed."""
+    results = []
+    for bits in bits_list:
+        suffix = f"_{workers}w" if workers and workers > 1 else ""
+        row = summarize(f"rsa_keygen_{bits}{suffix}", 0,
+                        measure(lambda: RSA.generate_keypair(bits, workers), repeat, 0))
+        results.append(row)
+        print(f"{bits}-bit keygen: mean {row['mean_ns'] / 1e6:.1f} ms, p95 {row['p95_ns'] / 1e6:.1f} ms, "
+              f"p99 {row['p99_ns'] / 1e6:.1f} ms, max {row['max_ns'] / 1e6:.1f} ms")
+    return results
+
+def bench_rsa(bits: int, message_sizes: list, repeat: int, warmup: int) -> list:
+    """Time RSA encrypt/decrypt of small messages."""
+    results = []
+    public_key, private_key = RSA.generate_keypair(bits)
+    for size in message_sizes:
+        message = os.urandom(size)
+        ciphertext = RSA.encrypt(public_key, message)
+        results.append(summarize(f"rsa_encrypt_{bits}", size,
+                                 measure(lambda: RSA.encrypt(public_key, message), repeat, warmup)))
+        results.append(summarize(f"rsa_decrypt_{bits}", size,
+                                 measure(lambda: RSA.decrypt(private_key, ciphertext), repeat, warmup)))
+    return results
+
+def bench_rsa_crt(bits_list: list, repeat: int, warmup: int) -> list:
+    """Time one decryption chunk with a full-size pow against CRT, with and without blinding."""
+    results = []
+    for bits in bits_list:
+        public_key, private_key = RSA.generate_keypair(bits)
+        d, n = private_key
+        chunk = RSA.random.randrange(2, n)
+        plain = summarize(f"rsa_chunk_pow_{bits}", 0, measure(lambda: pow(chunk, d, n), repeat, warmup))
+        crt = summarize(f"rsa_chunk_crt_{bits}", 0,
+                        measure(lambda: RSA.private_op(private_key, chunk, blinding=False), repeat, warmup))
+        blinded = summarize(f"rsa_chunk_crt_blinded_{bits}", 0,
+                            measure(lambda: RSA.private_op(private_key, chunk), repeat, warmup))
+        results += [plain, crt, blinded]
+        print(f"{bits}-bit: CRT speedup {plain['median_ns'] / crt['median_ns']:.2f}x, "
+              f"with blinding {plain['median_ns'] / blinded['median_ns']:.2f}x")
+    return results
+
+def bench_rsa_file(sizes: list, bits: int, repeat: int, chunked_max_size: int = CHUNKED_MAX_SIZE) -> list:
+    """Time file_encrypt_decrypt end to end in the hybrid and the chunked scheme."""
+    public_key, private_key = RSA.generate_keypair(bits)
+    results = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain_path = os.path.join(tmpdir, "plain.bin")
+        enc_path = os.path.join(tmpdir, "plain.enc")
+        dec_path = os.path.join(tmpdir, "plain.dec")
+        for size in sizes:
+            with open(plain_path, 'wb') as f:
+                for offset in range(0, size, 2**24):
+                    f.write(os.urandom(min(2**24, size - offset)))
+            for scheme in ("hybrid", "chunked"):
+                if scheme == "chunked" and size > chunked_max_size:
+                    print(f"Skipping chunked scheme at {size} bytes (limit {chunked_max_size}).")
+                    continue
+                encrypt = lambda: RSA.file_encrypt_decrypt(plain_path, enc_path, public_key, 'encrypt', scheme)
+                decrypt = lambda: RSA.file_encrypt_decrypt(enc_path, dec_path, private_key, 'decrypt')
+                results.append(summarize(f"rsa_file_{scheme}_encrypt", size, measure(encrypt, repeat, 1)))
+                results.append(summarize(f"rsa_file_{scheme}_decrypt", size, measure(decrypt, repeat, 1)))
+    return results
+
+def metadata() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def write_json(path: str, results: list):
+    with open(path, 'w') as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2)
+
+def write_csv(path: str, results: list):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(results[0]))
+        writer.writeheader()
+        writer.writerows(results)
+
+def load_results(path: str) -> list:
+    with open(path, 'r') as f:
+        return json.load(f)["results"]
+
+def print_results(results: list):
+    print(f"{'Operation':<28} {'Size':>12} {'Median ms':>11} {'p95 ms':>10} {'p99 ms':>10} {'MB/s':>10}")
+    for row in results:
+        mb_per_s = f"{row['mb_per_s']:.1f}" if row["mb_per_s"] else "-"
+        print(f"{row['operation']:<28} {row['size']:>12} {row['median_ns'] / 1e6:>11.3f} "
+              f"{row['p95_ns'] / 1e6:>10.3f} {row['p99_ns'] / 1e6:>10.3f} {mb_per_s:>10}")
+
+def compare(baseline: list, current: list, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """Print median changes against a baseline and return the rows that regressed past threshold."""
+    baseline_rows = {(row["operation"], row["size"]): row for row in baseline}
+    regressions = []
+    print(f"{'Operation':<28} {'Size':>12} {'Baseline ms':>12} {'Current ms':>12} {'Change':>8}")
+    for row in current:
+        old = baseline_rows.get((row["operation"], row["size"]))
+        if old is None:
+            continue
+        change = row["median_ns"] / old["median_ns"] - 1
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{row['operation']:<28} {row['size']:>12} {old['median_ns'] / 1e6:>12.3f} "
+              f"{row['median_ns'] / 1e6:>12.3f} {change:>+8.1%}{flag}")
+        if change > threshold:
+            regressions.append(row)
+    return regressions
+
+def plot_results(results: list, directory: str):
+    """Render one PNG per operation family into directory (matplotlib is only needed here)."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(directory, exist_ok=True)
+    families = {}
+    for row in results:
+        if row["size"]:
+            families.setdefault(row["operation"].split("_")[0], []).append(row)
+    for family, rows in families.items():
+        plt.figure(figsize=(10, 6))
+        for operation in sorted({row["operation"] for row in rows}):
+            points = [row for row in rows if row["operation"] == operation]
+            plt.plot([row["size"] for row in points], [row["median_ns"] / 1e6 for row in points],
+                     marker="o", label=f"{operation} (median)")
+        plt.xscale("log")
+        plt.yscale("log")
+        plt.xlabel("Input Size (Bytes)")
+        plt.ylabel("Time (ms)")
+        plt.title(f"{family.upper()} benchmark")
+        plt.legend()
+        plt.grid()
+        plt.tight_layout()
+        plt.savefig(os.path.join(directory, f"{family}.png"))
+        plt.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless AES/RSA benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=AES_SIZES, help="AES input sizes in bytes")
+    run_parser.add_argument("--repeat", type=int, default=REPEAT)
+    run_parser.add_argument("--warmup", type=int, default=WARMUP)
+    run_parser.add_argument("--rsa-bits", type=int, default=RSA_BITS)
+    run_parser.add_argument("--keygen-repeat", type=int, default=KEYGEN_REPEAT)
+    run_parser.add_argument("--rsa-file-sizes", type=int, nargs="*", default=RSA_FILE_SIZES,
+                            help="file sizes for the hybrid vs chunked file_encrypt_decrypt comparison")
+    run_parser.add_argument("--chunked-max-size", type=int, default=CHUNKED_MAX_SIZE)
+    run_parser.add_argument("--keygen-bits", type=int, nargs="*", default=RSA_KEYGEN_BITS)
+    run_parser.add_argument("--keygen-workers", type=int, default=None,
+                            help="race the prime search on this many processes")
+    run_parser.add_argument("--skip-rsa", action="store_true")
+    run_parser.add_argument("--crt-bits", type=int, nargs="*", default=RSA_CRT_BITS,
+                            help="key sizes for the per-chunk CRT decryption comparison")
+    run_parser.add_argument("--json", help="write results to this JSON file")
+    run_parser.add_argument("--csv", help="write results to this CSV file")
+    run_parser.add_argument("--plot", help="render PNG plots into this directory")
+
+    compare_parser = subparsers.add_parser("compare", help="compare a results JSON file with a saved baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        results = bench_aes(args.sizes, args.repeat, args.warmup)
+        if not args.skip_rsa:
+            results += bench_rsa_keygen(args.keygen_bits, args.keygen_repeat, args.keygen_workers)
+            results += bench_rsa(args.rsa_bits, RSA_MESSAGE_SIZES, args.repeat, args.warmup)
+            results += bench_rsa_crt(args.crt_bits, args.repeat, args.warmup)
+            results += bench_rsa_file(args.rsa_file_sizes, args.rsa_bits, max(1, args.repeat // 4),
+                                      args.chunked_max_size)
+        print_results(results)
+        if args.json:
+            write_json(args.json, results)
+        if args.csv:
+            write_csv(args.csv, results)
+        if args.plot:
+            plot_results(results, args.plot)
+    elif args.command == "compare":
+        regressions = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
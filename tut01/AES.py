@@ -1,18 +1,69 @@
+import io
 import os
+import hmac
+import hashlib
 import base64
+import mmap
+import argparse
+import getpass
+import queue
+import struct
 import time
+import tempfile
+import tracemalloc
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import psutil
-import matplotlib.pyplot as plt
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 # Constants for cryptographic operations
 SALT_LENGTH = 16
 KEY_LENGTH = 32  # 256-bit key size
 BLOCK_SIZE = 16  # AES block size
 ITERATION_COUNT = 100000
+TAG_LENGTH = 16  # GCM authentication tag size
+CHUNK_SIZE = 64 * 1024  # Streaming chunk size
+
+# Binary container: magic, version, KDF id, iterations, salt, nonce, tag, then raw ciphertext
+MAGIC = b"\x89AES"  # Leading non-base64 byte keeps it distinct from the legacy text format
+FORMAT_VERSION = 1
+KDF_PBKDF2_SHA256 = 1
+NONCE_LENGTH = 12  # Standard 96-bit GCM nonce
+HEADER = struct.Struct(">4sBBI%ds%ds%ds" % (SALT_LENGTH, NONCE_LENGTH, TAG_LENGTH))
+PREFIX = struct.Struct(">4sB")  # Magic and version, shared by every container version
+
+# Segmented container (version 2): independently authenticated segments that can be
+# processed in parallel. Segment i uses nonce prefix + i + final flag, and the whole
+# header (including the segment count) is the AAD of every segment, so segments
+# cannot be reordered, dropped or truncated without failing authentication.
+SEGMENTED_VERSION = 2
+SEGMENT_SIZE = 1024 * 1024
+NONCE_PREFIX_LENGTH = NONCE_LENGTH - 5  # 4-byte segment index + 1-byte final flag
+SEGMENTED_HEADER = struct.Struct(">4sBBI%ds%dsIQ" % (SALT_LENGTH, NONCE_PREFIX_LENGTH))
+
+# Envelope container (version 3): a random per-file data key wrapped (RFC 3394) by a
+# password-derived key-encryption key, so one KDF run can cover a whole batch of files.
+ENVELOPE_VERSION = 3
+WRAPPED_KEY_LENGTH = KEY_LENGTH + 8
+ENVELOPE_HEADER = struct.Struct(">4sBBI%ds%ds%ds%ds" % (SALT_LENGTH, WRAPPED_KEY_LENGTH, NONCE_LENGTH, TAG_LENGTH))
+
+# In-memory blob: magic, version, nonce, tag, then unpadded ciphertext. Blobs without
+# this prefix are read as the legacy padded iv + tag + ciphertext layout.
+BLOB_VERSION = 4
+BLOB_HEADER = struct.Struct(">4sB%ds%ds" % (NONCE_LENGTH, TAG_LENGTH))
+BLOB_PREFIX = PREFIX.pack(MAGIC, BLOB_VERSION)
+
+# Derived-key cache limits
+KEY_CACHE_SIZE = 64
+KEY_CACHE_TTL = 300.0  # Seconds
 
 def generate_encryption_key(password: str) -> bytes:
     """Generate a secure encryption key from the password using PBKDF2 with SHA-256."""
@@ -27,6 +78,110 @@ def generate_encryption_key(password: str) -> bytes:
     derived_key = kdf.derive(password.encode())
     return salt + derived_key  # Return key along with the salt for storage
 
+class DerivedKeyCache:
+    """Thread-safe LRU cache of PBKDF2 output with a TTL.
+
+    Entries are keyed by (password fingerprint, salt, iterations); the password
+    itself is never stored, only an HMAC of it under a per-process secret.
+    Cached keys are kept in bytearrays and overwritten with zeros when they are
+    evicted or cleared (best effort: copies handed to callers are not tracked).
+    """
+
+    def __init__(self, max_size: int = KEY_CACHE_SIZE, ttl: float = KEY_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._secret = os.urandom(32)
+        self._entries = OrderedDict()
+        self._in_flight = {}  # cache key -> Event set when its derivation finishes
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, password: str) -> bytes:
+        return hmac.new(self._secret, password.encode(), hashlib.sha256).digest()
+
+    @staticmethod
+    def _zeroise(key: bytearray):
+        key[:] = bytes(len(key))
+
+    def get(self, password: str, salt: bytes, iterations: int) -> bytes:
+        """Return the derived key, running PBKDF2 only on a miss.
+
+        Concurrent misses for the same entry (e.g. decrypt_tree's workers
+        starting on files that share a password and salt) wait for the one
+        derivation already in flight instead of each running PBKDF2.
+        """
+        cache_key = (self._fingerprint(password), bytes(salt), iterations)
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(cache_key)
+                if entry is not None:
+                    key, expires = entry
+                    if expires > now:
+                        self._entries.move_to_end(cache_key)
+                        self.hits += 1
+                        return bytes(key)
+                    del self._entries[cache_key]
+                    self._zeroise(key)
+                pending = self._in_flight.get(cache_key)
+                if pending is None:
+                    pending = self._in_flight[cache_key] = threading.Event()
+                    self.misses += 1
+                    break
+            pending.wait()  # Then look again; if that derivation failed, this thread runs its own
+
+        try:
+            key = bytearray(pbkdf2(password, salt, iterations))
+            with self._lock:
+                self._entries[cache_key] = (key, now + self.ttl)
+                while len(self._entries) > self.max_size:
+                    _, (evicted, _) = self._entries.popitem(last=False)
+                    self._zeroise(evicted)
+                return bytes(key)
+        finally:
+            with self._lock:
+                del self._in_flight[cache_key]
+            pending.set()
+
+    def clear(self):
+        """Drop and zeroise every cached key."""
+        with self._lock:
+            for key, _ in self._entries.values():
+                self._zeroise(key)
+            self._entries.clear()
+
+key_cache = DerivedKeyCache()
+
+def pbkdf2(password: str, salt: bytes, iterations: int = ITERATION_COUNT) -> bytes:
+    """Run PBKDF2-SHA256 without going through the cache."""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=KEY_LENGTH,
+        salt=salt,
+        iterations=iterations,
+        backend=default_backend()
+    )
+    return kdf.derive(password.encode())
+
+def derive_key(password: str, salt: bytes, iterations: int = ITERATION_COUNT) -> bytes:
+    """Derive the AES key for an existing salt using the same PBKDF2 parameters, via key_cache."""
+    return key_cache.get(password, salt, iterations)
+
+class KeyEncryptionKey:
+    """A password-derived key that wraps random per-file data keys (envelope encryption)."""
+
+    def __init__(self, password: str, salt: bytes = None, iterations: int = ITERATION_COUNT):
+        self.salt = salt if salt is not None else os.urandom(SALT_LENGTH)
+        self.iterations = iterations
+        self.key = derive_key(password, self.salt, iterations)
+
+    def wrap(self, data_key: bytes) -> bytes:
+        return aes_key_wrap(self.key, data_key, backend=default_backend())
+
+    def unwrap(self, wrapped_key: bytes) -> bytes:
+        return aes_key_unwrap(self.key, wrapped_key, backend=default_backend())
+
 def apply_padding(data: bytes) -> bytes:
     """Ensure that the data is a multiple of the block size by adding padding."""
     padding_length = BLOCK_SIZE - len(data) % BLOCK_SIZE
@@ -38,25 +193,84 @@ def remove_padding(data: bytes) -> bytes:
     padding_length = data[-1]
     return data[:-padding_length]
 
-def encrypt_data_gcm(plaintext: bytes, key: bytes) -> str:
-    """Encrypt the plaintext with AES-256 in GCM mode and return a Base64 encoded string with the tag."""
-    iv = os.urandom(BLOCK_SIZE)  # Generate a random initialization vector
-    cipher = Cipher(algorithms.AES(key), modes.GCM(iv), backend=default_backend())
-    encryptor = cipher.encryptor()
-    paddeddata=apply_padding(plaintext)
-    ciphertext = encryptor.update(paddeddata) + encryptor.finalize()
-    return base64.b64encode(iv + encryptor.tag + ciphertext).decode('utf-8')
+def encrypt_buffer_size(plaintext_length: int) -> int:
+    """Size of the output buffer encrypt_into needs (update_into wants block_size - 1 spare bytes)."""
+    return BLOB_HEADER.size + plaintext_length + BLOCK_SIZE - 1
+
+def decrypt_buffer_size(blob_length: int) -> int:
+    """Size of the output buffer decrypt_into needs for a blob of this length."""
+    return max(blob_length - BLOB_HEADER.size, 0) + BLOCK_SIZE - 1
+
+def encrypt_into(plaintext, key: bytes, out) -> int:
+    """Encrypt plaintext into the caller's writable buffer out and return the blob length.
+
+    The ciphertext is written straight into out with update_into and the
+    header is packed in place, so no intermediate copies are made. GCM is a
+    stream mode, so no padding is added.
+    """
+    out_view = memoryview(out)
+    nonce = os.urandom(NONCE_LENGTH)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce), backend=default_backend()).encryptor()
+    encryptor.authenticate_additional_data(BLOB_PREFIX)
+    written = encryptor.update_into(plaintext, out_view[BLOB_HEADER.size:])
+    encryptor.finalize()  # Always empty for GCM
+    BLOB_HEADER.pack_into(out_view, 0, MAGIC, BLOB_VERSION, nonce, encryptor.tag)
+    return BLOB_HEADER.size + written
+
+def decrypt_into(blob, key: bytes, out) -> int:
+    """Decrypt a blob from encrypt_into into the caller's writable buffer and return the plaintext length."""
+    view = memoryview(blob)
+    if len(view) < BLOB_HEADER.size:
+        raise ValueError("Encrypted blob is truncated.")
+    magic, version, nonce, tag = BLOB_HEADER.unpack_from(view)
+    if magic != MAGIC or version != BLOB_VERSION:
+        raise ValueError("Not an encrypted blob.")
+    decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag), backend=default_backend()).decryptor()
+    decryptor.authenticate_additional_data(BLOB_PREFIX)
+    written = decryptor.update_into(view[BLOB_HEADER.size:], out)
+    decryptor.finalize()
+    return written
 
-def decrypt_data_gcm(ciphertext_base64: str, key: bytes) -> bytes:
-    """Decrypt a Base64 encoded ciphertext using AES-256-GCM and return the plaintext."""
-    data = base64.b64decode(ciphertext_base64)
-    iv = data[:BLOCK_SIZE]
-    tag = data[BLOCK_SIZE:BLOCK_SIZE + 16]
+def encrypt_data_gcm(plaintext: bytes, key: bytes, raw: bool = False):
+    """Encrypt the plaintext with AES-256 in GCM mode and return a Base64 encoded string with the tag.
+
+    With raw=True the blob is returned as a bytearray without the Base64 pass.
+    """
+    out = bytearray(encrypt_buffer_size(len(plaintext)))
+    del out[encrypt_into(plaintext, key, out):]
+    if raw:
+        return out
+    return base64.b64encode(out).decode('utf-8')
+
+def decrypt_data_gcm(ciphertext_base64, key: bytes) -> bytearray:
+    """Decrypt a Base64 encoded (str) or raw (bytes) ciphertext using AES-256-GCM and return the plaintext.
+
+    Old padded iv + tag + ciphertext data is still accepted. The plaintext is
+    always a bytearray, like encrypt_data_gcm's raw output, so the current
+    format is returned without a second copy.
+    """
+    if isinstance(ciphertext_base64, str):
+        data = base64.b64decode(ciphertext_base64)
+    else:
+        data = memoryview(ciphertext_base64)
+    if data[:len(BLOB_PREFIX)] == BLOB_PREFIX:
+        out = bytearray(decrypt_buffer_size(len(data)))
+        del out[decrypt_into(data, key, out):]
+        return out
+    iv = bytes(data[:BLOCK_SIZE])
+    tag = bytes(data[BLOCK_SIZE:BLOCK_SIZE + 16])
     ciphertext = data[BLOCK_SIZE + 16:]
     cipher = Cipher(algorithms.AES(key), modes.GCM(iv, tag), backend=default_backend())
     decryptor = cipher.decryptor()
     paddeddata= decryptor.update(ciphertext) + decryptor.finalize()
-    return remove_padding(paddeddata)
+    return bytearray(remove_padding(paddeddata))
+
+def encrypt_data_gcm_legacy(plaintext: bytes, key: bytes) -> str:
+    """Produce the old padded iv + tag + ciphertext Base64 format (kept for compatibility checks)."""
+    iv = os.urandom(BLOCK_SIZE)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(iv), backend=default_backend()).encryptor()
+    ciphertext = encryptor.update(apply_padding(plaintext)) + encryptor.finalize()
+    return base64.b64encode(iv + encryptor.tag + ciphertext).decode('utf-8')
 
 def save_encrypted_data_to_file(filename: str, data: str):
     """Save encrypted data to a file as a Base64 string."""
@@ -76,102 +290,579 @@ def encrypt_file_to_base64(input_file: str, output_file: str, password: str):
     encrypted_text = encrypt_data_gcm(plaintext, key[16:])  # Use the key excluding the salt
     save_encrypted_data_to_file(output_file, base64.b64encode(key).decode('utf-8') + ":" + encrypted_text)
 
-def decrypt_file_from_base64(input_file: str, output_file: str, password: str):
+def decrypt_file_from_base64(input_file: str, output_file: str, password: str, encrypted_data: str = None):
     """Decrypt a Base64 encoded file and save the decrypted content."""
-    encrypted_data = load_encrypted_data_from_file(input_file)
+    if encrypted_data is None:
+        encrypted_data = load_encrypted_data_from_file(input_file)
     key_base64, ciphertext_base64 = encrypted_data.split(":")
     salt = base64.b64decode(key_base64)[:SALT_LENGTH]
-    key = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=KEY_LENGTH,
-        salt=salt,
-        iterations=ITERATION_COUNT,
-        backend=default_backend()
-    ).derive(password.encode())
+    key = derive_key(password, salt)
     decrypted_content = decrypt_data_gcm(ciphertext_base64, key)
-    with open(output_file, 'wb') as f:
+    with open_stream(output_file, 'wb') as f:
         f.write(decrypted_content)
 
-def evaluate_performance():
-    """Test and evaluate the performance of encryption and decryption."""
-    input_sizes = [2**10, 2**15, 2**20]  # Test with 1KB, 32KB, and 1MB
-    encryption_times = []
-    decryption_times = []
-    memory_usage = []
-    cpu_usage = []
-
-    password = "testpassword"
-
-    for size in input_sizes:
-        # Generate random data to test
-        plaintext = os.urandom(size)
-
-        # Measure memory and CPU usage before the operation
-        process = psutil.Process()
-        memory_before = process.memory_info().rss
-        cpu_before = process.cpu_percent(interval=None)
-
-        # Measure encryption time
-        start_time = time.time()
-        key = generate_encryption_key(password)
-        encrypt_data_gcm(plaintext, key[16:])
-        encryption_duration = time.time() - start_time
-
-        # Measure memory and CPU usage after encryption
-        memory_after = process.memory_info().rss
-        cpu_after = process.cpu_percent(interval=None)
-
-        # Store the results for encryption
-        encryption_times.append(encryption_duration)
-        memory_usage.append(memory_after - memory_before)
-        cpu_usage.append(cpu_after - cpu_before)
-
-        # Measure decryption time
-        ciphertext = encrypt_data_gcm(plaintext, key[16:])
-        start_time = time.time()
-        decrypt_data_gcm(ciphertext, key[16:])
-        decryption_duration = time.time() - start_time
-        decryption_times.append(decryption_duration)
-
-    # Plot performance results
-    plt.figure(figsize=(15, 10))
-
-    # Plot encryption and decryption times
-    plt.subplot(2, 2, 1)
-    plt.plot(input_sizes, encryption_times, label="Encryption Time", marker="o")
-    plt.plot(input_sizes, decryption_times, label="Decryption Time", marker="o")
-    plt.xlabel("Input Size (Bytes)")
-    plt.ylabel("Time (Seconds)")
-    plt.title("Encryption and Decryption Time")
-    plt.legend()
-    plt.grid()
-
-    # Plot memory usage
-    plt.subplot(2, 2, 2)
-    plt.bar([str(size) for size in input_sizes], memory_usage, color="grey")
-    plt.xlabel("Input Size (Bytes)")
-    plt.ylabel("Memory Usage (Bytes)")
-    plt.title("Memory Usage")
-    plt.grid()
-
-    # Plot CPU usage
-    plt.subplot(2, 2, 3)
-    plt.bar([str(size) for size in input_sizes], cpu_usage, color="lightyellow")
-    plt.xlabel("Input Size (Bytes)")
-    plt.ylabel("CPU Usage (%)")
-    plt.title("CPU Usage")
-    plt.grid()
-
-    plt.tight_layout()
-    plt.show()
+@contextmanager
+def open_stream(file, mode: str):
+    """Yield a binary file object for either a path or an already open file object."""
+    if hasattr(file, "read") or hasattr(file, "write"):
+        yield file
+    else:
+        with open(file, mode) as f:
+            yield f
 
-if __name__ == "__main__":
+def pack_header(salt: bytes, nonce: bytes, tag: bytes = bytes(TAG_LENGTH),
+                iterations: int = ITERATION_COUNT) -> bytes:
+    """Build the binary container header."""
+    return HEADER.pack(MAGIC, FORMAT_VERSION, KDF_PBKDF2_SHA256, iterations, salt, nonce, tag)
+
+def unpack_header(header) -> tuple:
+    """Parse and check a container header, returning (iterations, salt, nonce, tag)."""
+    if len(header) != HEADER.size:
+        raise ValueError("Encrypted stream is truncated.")
+    magic, version, kdf_id, iterations, salt, nonce, tag = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError("Not an encrypted container file.")
+    if version != FORMAT_VERSION:
+        raise ValueError(f"Unsupported container version {version}.")
+    if kdf_id != KDF_PBKDF2_SHA256:
+        raise ValueError(f"Unsupported key derivation function {kdf_id}.")
+    return iterations, salt, nonce, tag
+
+def run_cipher(context, src, dst, chunk_size: int = CHUNK_SIZE):
+    """Push src through an encryptor/decryptor into dst with two reusable buffers.
+
+    Data is read with readinto and processed with update_into, so memory use
+    does not grow with the file size.
+    """
+    in_buffer = bytearray(chunk_size)
+    in_view = memoryview(in_buffer)
+    out_buffer = bytearray(chunk_size + BLOCK_SIZE - 1)  # update_into needs block_size - 1 spare bytes
+    out_view = memoryview(out_buffer)
+    while True:
+        n = src.readinto(in_buffer)
+        if not n:
+            break
+        written = context.update_into(in_view[:n], out_buffer)
+        dst.write(out_view[:written])
+    dst.write(context.finalize())
+
+def encrypt_container(input_file, output_file, key: bytes, nonce: bytes, header: bytes,
+                      chunk_size: int = CHUNK_SIZE):
+    """Write header + ciphertext, authenticating the header, then patch the tag into its last bytes.
+
+    The tag is only known at the end, so the output must be seekable.
+    """
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce), backend=default_backend()).encryptor()
+    encryptor.authenticate_additional_data(header[:-TAG_LENGTH])
+    with open_stream(input_file, 'rb') as src, open_stream(output_file, 'wb') as dst:
+        if not dst.seekable():
+            raise ValueError("Output must be seekable to store the authentication tag.")
+        start = dst.tell()
+        dst.write(header)
+        run_cipher(encryptor, src, dst, chunk_size)
+        end = dst.tell()
+        dst.seek(start + len(header) - TAG_LENGTH)
+        dst.write(encryptor.tag)
+        dst.seek(end)
+
+def encrypt_file_stream(input_file, output_file, password: str, chunk_size: int = CHUNK_SIZE):
+    """Encrypt a file into the binary container in fixed-size chunks."""
+    salt = os.urandom(SALT_LENGTH)
+    nonce = os.urandom(NONCE_LENGTH)
+    key = derive_key(password, salt)
+    encrypt_container(input_file, output_file, key, nonce, pack_header(salt, nonce), chunk_size)
+
+def encrypt_file_envelope(input_file, output_file, kek: KeyEncryptionKey, chunk_size: int = CHUNK_SIZE):
+    """Encrypt a file under a fresh random data key wrapped by kek.
+
+    Reusing one KeyEncryptionKey for many files costs a single PBKDF2 run.
+    """
+    data_key = AESGCM.generate_key(bit_length=KEY_LENGTH * 8)
+    nonce = os.urandom(NONCE_LENGTH)
+    header = ENVELOPE_HEADER.pack(MAGIC, ENVELOPE_VERSION, KDF_PBKDF2_SHA256, kek.iterations,
+                                  kek.salt, kek.wrap(data_key), nonce, bytes(TAG_LENGTH))
+    encrypt_container(input_file, output_file, data_key, nonce, header, chunk_size)
+
+def decrypt_file_stream(input_file, output_file, password: str, chunk_size: int = CHUNK_SIZE,
+                        workers: int = None):
+    """Decrypt any container file chunk by chunk, falling back to the legacy Base64 format.
+
+    Segmented (version 2) containers are handed to decrypt_file_segmented. The
+    tag is only checked at the end, so an output path is written through
+    write_atomically: if anything fails, a file already at that path is left
+    untouched. Input that is neither a container nor Base64 text raises
+    ValueError.
+    """
+    if isinstance(output_file, (str, os.PathLike)):
+        write_atomically(lambda src, dst: decrypt_file_stream(src, dst, password, chunk_size, workers),
+                         input_file, os.fspath(output_file))
+        return
+    with open_stream(input_file, 'rb') as src:
+        prefix = src.read(PREFIX.size)
+        if prefix[:len(MAGIC)] != MAGIC:
+            # Legacy base64(salt+key):base64(iv+tag+ciphertext) text file
+            try:
+                legacy_text = (prefix + src.read()).decode('ascii')
+            except UnicodeDecodeError:
+                raise ValueError("Not an encrypted container or Base64 text file.") from None
+            if legacy_text.count(":") != 1:
+                raise ValueError("Not an encrypted container or Base64 text file.")
+            decrypt_file_from_base64(input_file, output_file, password, legacy_text)
+            return
+        version = prefix[len(MAGIC)] if len(prefix) == PREFIX.size else None
+        if version == SEGMENTED_VERSION:
+            decrypt_file_segmented(src, output_file, password, workers, prefix)
+            return
+        if version == ENVELOPE_VERSION:
+            header = prefix + src.read(ENVELOPE_HEADER.size - PREFIX.size)
+            if len(header) != ENVELOPE_HEADER.size:
+                raise ValueError("Encrypted stream is truncated.")
+            _, _, kdf_id, iterations, salt, wrapped_key, nonce, tag = ENVELOPE_HEADER.unpack(header)
+            if kdf_id != KDF_PBKDF2_SHA256:
+                raise ValueError(f"Unsupported key derivation function {kdf_id}.")
+            key = KeyEncryptionKey(password, salt, iterations).unwrap(wrapped_key)
+        else:
+            header = prefix + src.read(HEADER.size - len(prefix))
+            iterations, salt, nonce, tag = unpack_header(header)
+            key = derive_key(password, salt, iterations)
+
+        decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag), backend=default_backend()).decryptor()
+        decryptor.authenticate_additional_data(header[:-TAG_LENGTH])
+        with open_stream(output_file, 'wb') as dst:
+            run_cipher(decryptor, src, dst, chunk_size)
+
+def stream_size(f) -> int:
+    """Return the number of bytes left in a seekable file object."""
+    position = f.tell()
+    end = f.seek(0, os.SEEK_END)
+    f.seek(position)
+    return end - position
+
+def segment_nonce(prefix: bytes, index: int, final: bool) -> bytes:
+    """Derive the nonce of one segment from the per-file prefix, its index and the final flag."""
+    return prefix + struct.pack(">IB", index, final)
+
+def ordered_map(executor, function, items, window: int):
+    """Like executor.map, but keep at most window tasks in flight so memory stays bounded."""
+    pending = deque()
+    for item in items:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(function, *item))
+    while pending:
+        yield pending.popleft().result()
+
+def unpack_segmented_header(header) -> tuple:
+    """Parse and check a segmented header, returning (iterations, salt, prefix, segment_size, segment_count)."""
+    if len(header) != SEGMENTED_HEADER.size:
+        raise ValueError("Encrypted stream is truncated.")
+    (magic, version, kdf_id, iterations, salt, prefix,
+     segment_size, segment_count) = SEGMENTED_HEADER.unpack(header)
+    if magic != MAGIC or version != SEGMENTED_VERSION:
+        raise ValueError("Not a segmented container file.")
+    if kdf_id != KDF_PBKDF2_SHA256:
+        raise ValueError(f"Unsupported key derivation function {kdf_id}.")
+    if segment_count < 1 or segment_size < 1:
+        raise ValueError("Encrypted stream has no segments.")
+    return iterations, salt, prefix, segment_size, segment_count
+
+def encrypt_file_segmented(input_file, output_file, password: str, workers: int = None,
+                           segment_size: int = SEGMENT_SIZE):
+    """Encrypt a file as independently authenticated segments on a thread pool.
+
+    The cryptography backend releases the GIL while encrypting, so threads are
+    enough to use every core. Output segments are written in order as
+    ciphertext + tag; only 2 * workers segments are held in memory at once.
+    """
+    workers = workers or os.cpu_count() or 1
+    salt = os.urandom(SALT_LENGTH)
+    prefix = os.urandom(NONCE_PREFIX_LENGTH)
+    aesgcm = AESGCM(derive_key(password, salt))
+
+    with open_stream(input_file, 'rb') as src, open_stream(output_file, 'wb') as dst:
+        size = stream_size(src)
+        segment_count = max(1, -(-size // segment_size))  # An empty file still gets one final segment
+        header = SEGMENTED_HEADER.pack(MAGIC, SEGMENTED_VERSION, KDF_PBKDF2_SHA256, ITERATION_COUNT,
+                                       salt, prefix, segment_size, segment_count)
+        dst.write(header)
+
+        def encrypt_segment(index, segment):
+            nonce = segment_nonce(prefix, index, index == segment_count - 1)
+            return aesgcm.encrypt(nonce, segment, header)
+
+        def read_segments():
+            for index in range(segment_count):
+                segment = bytearray(segment_size)
+                n = src.readinto(segment)
+                yield index, memoryview(segment)[:n]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for ciphertext in ordered_map(executor, encrypt_segment, read_segments(), 2 * workers):
+                dst.write(ciphertext)
+
+def decrypt_file_segmented(input_file, output_file, password: str, workers: int = None,
+                           prefix_bytes: bytes = b""):
+    """Decrypt a segmented container on a thread pool, verifying every segment.
+
+    Raises ValueError if segments are missing or trailing data follows the
+    final segment, and InvalidTag if any segment was modified or moved.
+    prefix_bytes holds header bytes already consumed by decrypt_file_stream.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open_stream(input_file, 'rb') as src:
+        header = prefix_bytes + src.read(SEGMENTED_HEADER.size - len(prefix_bytes))
+        iterations, salt, prefix, segment_size, segment_count = unpack_segmented_header(header)
+        aesgcm = AESGCM(derive_key(password, salt, iterations))
+
+        def decrypt_segment(index, segment):
+            nonce = segment_nonce(prefix, index, index == segment_count - 1)
+            return aesgcm.decrypt(nonce, segment, header)
+
+        def read_segments():
+            for index in range(segment_count):
+                segment = bytearray(segment_size + TAG_LENGTH)
+                n = src.readinto(segment)
+                if n < TAG_LENGTH or (n < len(segment) and index < segment_count - 1):
+                    raise ValueError("Encrypted stream is truncated.")
+                yield index, memoryview(segment)[:n]
+            if src.read(1):
+                raise ValueError("Unexpected data after the final segment.")
+
+        with open_stream(output_file, 'wb') as dst, ThreadPoolExecutor(max_workers=workers) as executor:
+            for plaintext in ordered_map(executor, decrypt_segment, read_segments(), 2 * workers):
+                dst.write(plaintext)
+
+def read_range(path, offset: int, length: int, password: str) -> bytes:
+    """Decrypt length bytes starting at plaintext offset from a segmented container.
+
+    Segments have a fixed size, so the segment index is plain arithmetic:
+    segment i starts at header + i * (segment_size + tag). Only the segments
+    covering the range are read (through a memory map) and authenticated.
+    """
+    if offset < 0 or length < 0:
+        raise ValueError("Offset and length must not be negative.")
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        header = mapped[:SEGMENTED_HEADER.size]
+        iterations, salt, prefix, segment_size, segment_count = unpack_segmented_header(header)
+        stride = segment_size + TAG_LENGTH
+        body_size = len(mapped) - SEGMENTED_HEADER.size
+        if not (segment_count - 1) * stride + TAG_LENGTH <= body_size <= segment_count * stride:
+            raise ValueError("Encrypted file size does not match its segment count.")
+        plaintext_size = body_size - segment_count * TAG_LENGTH
+
+        end = min(offset + length, plaintext_size)
+        if offset >= end:
+            return b""
+        first = offset // segment_size
+        last = (end - 1) // segment_size
+        aesgcm = AESGCM(derive_key(password, salt, iterations))
+        plaintext = bytearray()
+        with memoryview(mapped) as view:
+            for index in range(first, last + 1):
+                start = SEGMENTED_HEADER.size + index * stride
+                nonce = segment_nonce(prefix, index, index == segment_count - 1)
+                plaintext += aesgcm.decrypt(nonce, view[start:start + stride], header)
+        skip = offset - first * segment_size
+        return bytes(plaintext[skip:skip + end - offset])
+
+def write_atomically(function, src_path: str, dst_path: str):
+    """Run function(src_path, file) into dst_path + ".partial", then fsync and rename it into place.
+
+    A finished output therefore always is complete, which is what lets an
+    interrupted tree run be resumed.
+    """
+    os.makedirs(os.path.dirname(dst_path) or ".", exist_ok=True)
+    partial_path = dst_path + ".partial"
+    try:
+        with open(partial_path, 'wb') as f:
+            function(src_path, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial_path, dst_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+def process_tree(src_dir: str, dst_dir: str, function, rename, workers: int = None) -> dict:
+    """Apply function to every file under src_dir, writing dst_dir/rename(relative path).
+
+    The directory walk feeds a bounded queue drained by a pool of worker
+    threads, so reading, encryption and writing of different files overlap.
+    Outputs that already exist and are newer than their source are skipped,
+    which resumes an interrupted run. Returns counts, failures and throughput.
+    """
+    workers = workers or os.cpu_count() or 1
+    tasks = queue.Queue(maxsize=workers * 4)
+    lock = threading.Lock()
+    stats = {"files": 0, "bytes": 0, "skipped": 0, "failed": []}
+
+    def worker():
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            src_path, dst_path = task
+            try:
+                write_atomically(function, src_path, dst_path)
+                size = os.path.getsize(src_path)
+                with lock:
+                    stats["files"] += 1
+                    stats["bytes"] += size
+            except Exception as e:
+                with lock:
+                    stats["failed"].append((src_path, e))
+
+    start_time = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    try:
+        for root, dirs, files in os.walk(src_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith(".partial"):
+                    continue  # Left behind by an interrupted run
+                src_path = os.path.join(root, name)
+                dst_path = os.path.join(dst_dir, rename(os.path.relpath(src_path, src_dir)))
+                if os.path.exists(dst_path) and os.path.getmtime(dst_path) >= os.path.getmtime(src_path):
+                    stats["skipped"] += 1
+                    continue
+                tasks.put((src_path, dst_path))
+    finally:
+        for _ in threads:
+            tasks.put(None)
+        for thread in threads:
+            thread.join()
+
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["files_per_second"] = stats["files"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["bytes_per_second"] = stats["bytes"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+def encrypt_tree(src_dir: str, dst_dir: str, password: str, workers: int = None) -> dict:
+    """Envelope-encrypt every file under src_dir into dst_dir/<path>.enc with a single key derivation."""
+    kek = KeyEncryptionKey(password)
+    return process_tree(src_dir, dst_dir, lambda src, dst: encrypt_file_envelope(src, dst, kek),
+                        lambda path: path + ".enc", workers)
+
+def decrypt_tree(src_dir: str, dst_dir: str, password: str, workers: int = None) -> dict:
+    """Decrypt every file under src_dir into dst_dir, dropping the .enc suffix.
+
+    Files from one encrypt_tree run share a salt, so key_cache makes this a single derivation too.
+    """
+    return process_tree(src_dir, dst_dir, lambda src, dst: decrypt_file_stream(src, dst, password, workers=1),
+                        lambda path: path[:-len(".enc")] if path.endswith(".enc") else path, workers)
+
+def print_tree_stats(stats: dict):
+    """Print the summary returned by process_tree."""
+    print(f"Processed {stats['files']} files ({stats['bytes'] / 2**20:.1f} MB) in {stats['seconds']:.2f} s, "
+          f"skipped {stats['skipped']} up-to-date files.")
+    print(f"{stats['files_per_second']:.1f} files/s, {stats['bytes_per_second'] / 2**20:.1f} MB/s")
+    for path, error in stats["failed"]:
+        print(f"Failed: {path}: {error}")
+
+def benchmark_workers(size: int = 2**28, worker_counts=(1, 2, 4, 8), password: str = "testpassword"):
+    """Report segmented encryption/decryption throughput for each worker count."""
+    print(f"{'Workers':>8} {'Enc MB/s':>10} {'Dec MB/s':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain_path = os.path.join(tmpdir, "plain.bin")
+        enc_path = os.path.join(tmpdir, "plain.enc")
+        dec_path = os.path.join(tmpdir, "plain.dec")
+        with open(plain_path, 'wb') as f:
+            for _ in range(0, size, SEGMENT_SIZE):
+                f.write(os.urandom(min(SEGMENT_SIZE, size - f.tell())))
+        megabytes = size / 2**20
+        for workers in worker_counts:
+            start_time = time.perf_counter()
+            encrypt_file_segmented(plain_path, enc_path, password, workers)
+            encryption_duration = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            decrypt_file_segmented(enc_path, dec_path, password, workers)
+            decryption_duration = time.perf_counter() - start_time
+            print(f"{workers:>8} {megabytes / encryption_duration:>10.1f} {megabytes / decryption_duration:>10.1f}")
+
+def allocation_per_mb(size: int = 2**24) -> dict:
+    """Measure peak Python allocation per MB of data with tracemalloc.
+
+    encrypt_into/decrypt_into into preallocated buffers should stay near zero;
+    encrypt_data_gcm/decrypt_data_gcm(raw) should stay at about one copy (1 MB per MB).
+    """
+    key = os.urandom(KEY_LENGTH)
+    plaintext = os.urandom(size)
+    blob = bytearray(encrypt_buffer_size(size))
+    blob_length = encrypt_into(plaintext, key, blob)
+    decrypted = bytearray(decrypt_buffer_size(blob_length))
+    blob_view = memoryview(blob)[:blob_length]
+
+    cases = {
+        "encrypt_into": lambda: encrypt_into(plaintext, key, blob),
+        "decrypt_into": lambda: decrypt_into(blob_view, key, decrypted),
+        "encrypt_data_gcm(raw)": lambda: encrypt_data_gcm(plaintext, key, raw=True),
+        "decrypt_data_gcm(raw)": lambda: decrypt_data_gcm(blob_view, key),
+    }
+    results = {}
+    for name, case in cases.items():
+        tracemalloc.start()
+        case()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = peak / (size / 2**20)
+    return results
+
+def check_allocations(size: int = 2**24):
+    """Fail if allocation_per_mb shows more copies than the in-place design allows.
+
+    The *_into functions may allocate only small constants (at most 1% of the
+    data); encrypt_data_gcm/decrypt_data_gcm(raw) at most one copy plus 1%.
+    """
+    limits = {"encrypt_into": 0.01, "decrypt_into": 0.01,
+              "encrypt_data_gcm(raw)": 1.01, "decrypt_data_gcm(raw)": 1.01}
+    for name, per_mb in allocation_per_mb(size).items():
+        ratio = per_mb / 2**20
+        print(f"{name:<24} {ratio:8.3f} MB allocated per MB (limit {limits[name]})")
+        if ratio > limits[name]:
+            raise AssertionError(f"{name} allocates {ratio:.3f} MB per MB, over the limit of {limits[name]}")
+    print("Allocation checks passed.")
+
+def benchmark_envelope(file_count: int = 10000, size: int = 1024, baseline_sample: int = 100,
+                       password: str = "testpassword"):
+    """Compare per-file latency of password-per-file encryption with envelope encryption.
+
+    The per-file PBKDF2 path is timed on the first baseline_sample files only,
+    since running it for all of them takes minutes.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        paths = []
+        for i in range(file_count):
+            path = os.path.join(tmpdir, f"file{i}.bin")
+            with open(path, 'wb') as f:
+                f.write(os.urandom(size))
+            paths.append(path)
+
+        sample = paths[:baseline_sample]
+        start_time = time.perf_counter()
+        for path in sample:
+            encrypt_file_stream(path, path + ".enc", password)
+        per_file_before = (time.perf_counter() - start_time) / len(sample)
+
+        start_time = time.perf_counter()
+        kek = KeyEncryptionKey(password)
+        for path in paths:
+            encrypt_file_envelope(path, path + ".env", kek)
+        per_file_after = (time.perf_counter() - start_time) / len(paths)
+
+        key_cache.clear()
+        hits_before = key_cache.hits
+        start_time = time.perf_counter()
+        for path in paths:
+            decrypt_file_stream(path + ".env", path + ".dec", password)
+        per_file_decrypt = (time.perf_counter() - start_time) / len(paths)
+
+    print(f"Per-file KDF encryption:  {per_file_before * 1e3:8.3f} ms/file ({len(sample)} files)")
+    print(f"Envelope encryption:      {per_file_after * 1e3:8.3f} ms/file ({len(paths)} files)")
+    print(f"Envelope decryption:      {per_file_decrypt * 1e3:8.3f} ms/file (key cache hits: {key_cache.hits - hits_before})")
+
+class PeakRSSSampler:
+    """Sample the process RSS in a background thread and keep the maximum seen."""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._process.memory_info().rss)
+
+def benchmark_streaming(sizes=None, password: str = "testpassword"):
+    """Report MB/s and peak RSS of streaming encryption/decryption for 1 MB to 4 GB files."""
+    if sizes is None:
+        sizes = [2**20, 2**24, 2**28, 2**30, 2**32]  # 1MB, 16MB, 256MB, 1GB, 4GB
+    print(f"{'Size (MB)':>10} {'Enc MB/s':>10} {'Dec MB/s':>10} {'Peak RSS (MB)':>14}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        plain_path = os.path.join(tmpdir, "plain.bin")
+        enc_path = os.path.join(tmpdir, "plain.enc")
+        dec_path = os.path.join(tmpdir, "plain.dec")
+        for size in sizes:
+            with open(plain_path, 'wb') as f:
+                remaining = size
+                while remaining:
+                    n = min(remaining, CHUNK_SIZE * 16)
+                    f.write(os.urandom(n))
+                    remaining -= n
+
+            with PeakRSSSampler() as sampler:
+                start_time = time.perf_counter()
+                encrypt_file_stream(plain_path, enc_path, password)
+                encryption_duration = time.perf_counter() - start_time
+
+                start_time = time.perf_counter()
+                decrypt_file_stream(enc_path, dec_path, password)
+                decryption_duration = time.perf_counter() - start_time
+
+            megabytes = size / 2**20
+            print(f"{megabytes:>10.0f} {megabytes / encryption_duration:>10.1f} "
+                  f"{megabytes / decryption_duration:>10.1f} {sampler.peak / 2**20:>14.1f}")
+
+def check_segmented(segment_size: int = 4096, segments: int = 4, password: str = "testpassword"):
+    """Tamper with a segmented container in each way the format must detect and check every one fails.
+
+    Swapping two segments, dropping the last one, truncating by one byte and
+    appending bytes must each raise InvalidTag or ValueError; the untouched
+    container must still decrypt to the original data.
+    """
+    plaintext = os.urandom(segment_size * segments - segment_size // 2)  # Last segment is partial
+    container = io.BytesIO()
+    encrypt_file_segmented(io.BytesIO(plaintext), container, password, segment_size=segment_size)
+    data = container.getvalue()
+    body = SEGMENTED_HEADER.size
+    stride = segment_size + TAG_LENGTH
+
+    def decrypt(blob):
+        output = io.BytesIO()
+        decrypt_file_stream(io.BytesIO(blob), output, password)
+        return output.getvalue()
+
+    assert decrypt(data) == plaintext, "Untouched container did not decrypt to the original data"
+    tampered = {
+        "swap segments 0 and 1": (data[:body] + data[body + stride:body + 2 * stride]
+                                  + data[body:body + stride] + data[body + 2 * stride:]),
+        "drop the last segment": data[:body + (segments - 1) * stride],
+        "truncate by one byte": data[:-1],
+        "append bytes": data + b"\x00" * TAG_LENGTH,
+    }
+    for name, blob in tampered.items():
+        try:
+            decrypt(blob)
+        except (InvalidTag, ValueError) as e:
+            print(f"{name:<24} rejected: {type(e).__name__} {e}".rstrip())
+        else:
+            raise AssertionError(f"Tampered container accepted: {name}")
+    print("Segmented container checks passed.")
+
+def run_demo():
+    """Encrypt and decrypt input.txt and verify the round trip (benchmarks live in ../benchmark.py)."""
     try:
         # Encrypt and decrypt a sample file
-        encrypt_file_to_base64("input.txt", "encrypted_output.txt", "testpassword")
+        encrypt_file_stream("input.txt", "encrypted_output.bin", "testpassword")
         print("File encryption completed successfully.")
         
-        decrypt_file_from_base64("encrypted_output.txt", "decrypted_output.txt", "testpassword")
+        decrypt_file_stream("encrypted_output.bin", "decrypted_output.txt", "testpassword")
         print("File decryption completed successfully.")
         
         # Verify if the decrypted file matches the original
@@ -186,8 +877,71 @@ if __name__ == "__main__":
         else:
             print("Decryption failed: content does not match the original.")
 
-        # Run performance tests
-        evaluate_performance()
-
     except Exception as e:
         print(f"Error occurred: {e}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="AES-256-GCM file encryption. Runs the demo when no command is given.")
+    subparsers = parser.add_subparsers(dest="command")
+
+    encrypt_parser = subparsers.add_parser("encrypt", help="encrypt a file as parallel segments")
+    encrypt_parser.add_argument("input")
+    encrypt_parser.add_argument("output")
+    encrypt_parser.add_argument("--workers", type=int, default=None, help="worker threads (default: CPU count)")
+    encrypt_parser.add_argument("--password", help="prompted for when omitted")
+
+    decrypt_parser = subparsers.add_parser("decrypt", help="decrypt any container or legacy Base64 file")
+    decrypt_parser.add_argument("input")
+    decrypt_parser.add_argument("output")
+    decrypt_parser.add_argument("--workers", type=int, default=None, help="worker threads (default: CPU count)")
+    decrypt_parser.add_argument("--password", help="prompted for when omitted")
+
+    for command, action in (("encrypt-tree", "encrypt"), ("decrypt-tree", "decrypt")):
+        tree_parser = subparsers.add_parser(command, help=f"{action} every file under a directory")
+        tree_parser.add_argument("src")
+        tree_parser.add_argument("dst")
+        tree_parser.add_argument("--workers", type=int, default=None, help="worker threads (default: CPU count)")
+        tree_parser.add_argument("--password", help="prompted for when omitted")
+
+    subparsers.add_parser("benchmark-allocations", help="peak bytes allocated per MB of data")
+    subparsers.add_parser("benchmark-envelope", help="per-file latency for 10,000 small files")
+
+    streaming_parser = subparsers.add_parser("benchmark-streaming", help="MB/s and peak RSS for 1 MB to 4 GB files")
+    streaming_parser.add_argument("--sizes", type=int, nargs="+", default=None,
+                                  help="input sizes in bytes (default: 1 MB, 16 MB, 256 MB, 1 GB, 4 GB)")
+    subparsers.add_parser("check-allocations", help="fail if buffer APIs allocate more than one copy per byte")
+    subparsers.add_parser("check-segmented", help="check that tampered segmented containers are rejected")
+
+    bench_parser = subparsers.add_parser("benchmark-workers", help="segmented throughput per worker count")
+    bench_parser.add_argument("--size", type=int, default=2**28, help="input size in bytes")
+    bench_parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        run_demo()
+    elif args.command == "encrypt":
+        password = args.password or getpass.getpass()
+        encrypt_file_segmented(args.input, args.output, password, args.workers)
+    elif args.command == "decrypt":
+        password = args.password or getpass.getpass()
+        decrypt_file_stream(args.input, args.output, password, workers=args.workers)
+    elif args.command in ("encrypt-tree", "decrypt-tree"):
+        password = args.password or getpass.getpass()
+        tree_function = encrypt_tree if args.command == "encrypt-tree" else decrypt_tree
+        print_tree_stats(tree_function(args.src, args.dst, password, args.workers))
+    elif args.command == "benchmark-allocations":
+        for name, per_mb in allocation_per_mb().items():
+            print(f"{name:<24} {per_mb / 2**20:8.3f} MB allocated per MB")
+    elif args.command == "benchmark-envelope":
+        benchmark_envelope()
+    elif args.command == "benchmark-workers":
+        benchmark_workers(args.size, args.workers)
+    elif args.command == "benchmark-streaming":
+        benchmark_streaming(args.sizes)
+    elif args.command == "check-allocations":
+        check_allocations()
+    elif args.command == "check-segmented":
+        check_segmented()
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,38 @@
+import io
+import os
 import random
 import math
 import time
-import psutil
-import matplotlib.pyplot as plt
+import struct
+import secrets
+import threading
+from collections import deque
+from functools import cached_property
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+SMALL_PRIME_LIMIT = 50000  # Sieve candidates against the ~5,000 primes below this
+SIEVE_WINDOW = 4096  # Odd candidates examined per window
+PUBLIC_EXPONENT = 65537
+
+# Binary file format: magic, version, scheme, then the scheme's payload. Files
+# without the magic are the original space-separated decimal chunks.
+FILE_MAGIC = b"\x89RSA"
+FILE_VERSION = 1
+SCHEME_HYBRID = 1  # RSA-KEM wrapped AES-256-GCM key, then the streamed payload
+SCHEME_CHUNKED = 2  # RSA per chunk, fixed-width binary blocks
+FILE_HEADER = struct.Struct(">4sBB")
+KEM_HEADER = struct.Struct(">H")  # Length of the KEM ciphertext (modulus size in bytes)
+BLOCK_HEADER = struct.Struct(">H")  # Block width k (modulus size in bytes)
+BLOCK_LENGTH = struct.Struct(">H")  # Plaintext length stored in front of each k-byte block
+KEY_MAGIC = b"\x89RSK"  # Key store file: magic, version, then length-prefixed e, n, d, p, q
+KEY_VERSION = 1
+KEY_HEADER = struct.Struct(">4sB")
+INT_LENGTH = struct.Struct(">H")
+NONCE_LENGTH = 12
+TAG_LENGTH = 16
+CHUNK_SIZE = 64 * 1024
 
 def is_prime(n, k=5):
    
@@ -29,13 +59,69 @@ def is_prime(n, k=5):
             return False
     return True
 
+def small_primes(limit):
+    """Odd primes below limit (sieve of Eratosthenes)."""
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(3, limit) if sieve[i]]
+
+SMALL_PRIMES = small_primes(SMALL_PRIME_LIMIT)
+
+def random_candidate(bits):
+    """Random odd number with the top two bits set, so the product of two is exactly 2 * bits long.
+
+    The bits come from the OS CSPRNG (secrets): primes become the private
+    key, so they must not be predictable from Mersenne Twister output.
+    """
+    return secrets.randbits(bits) | (3 << (bits - 2)) | 1
+
+def search_window(base, window=SIEVE_WINDOW):
+    """Return the first prime among base, base + 2, ..., or None.
+
+    Candidates divisible by any of SMALL_PRIMES are crossed off first, so
+    Miller-Rabin only runs on the few survivors.
+    """
+    sieve = bytearray([1]) * window
+    for sp in SMALL_PRIMES:
+        if sp >= base:
+            break  # Only reached for toy key sizes, where it would cross off sp itself
+        # First i with base + 2i divisible by sp: i = -base / 2 mod sp
+        start = (-base * (sp + 1) // 2) % sp
+        if start < window:
+            sieve[start::sp] = bytes(len(range(start, window, sp)))
+    for i in range(window):
+        if sieve[i] and is_prime(base + 2 * i):
+            return base + 2 * i
+    return None
+
 def generate_prime(bits):
-    """Generate a prime number with the specified number of bits."""
+    """Generate a prime number with exactly the specified number of bits."""
     while True:
-        p = random.getrandbits(bits)
-        if is_prime(p):
+        base = random_candidate(bits)
+        p = search_window(base, min(SIEVE_WINDOW, 1 << max(bits - 3, 0)))
+        if p is not None and p.bit_length() == bits:
             return p
 
+def search_random_window(bits):
+    """Worker-process entry point: sieve one window from a fresh random base."""
+    return search_window(random_candidate(bits))
+
+def generate_prime_parallel(bits, executor, workers):
+    """Race workers windows on a process pool and return the first prime found."""
+    while True:
+        pending = {executor.submit(search_random_window, bits) for _ in range(workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                p = future.result()
+                if p is not None and p.bit_length() == bits:
+                    for other in pending:
+                        other.cancel()
+                    return p
+
 def gcd(a, b):
     while b:
         a, b = b, a % b
@@ -54,16 +140,95 @@ def modinv(e, phi):
         raise ValueError("Modular inverse does not exist")
     return x % phi
 
-def generate_keypair(bits):
-    p = generate_prime(bits // 2)
-    q = generate_prime(bits // 2)
-    while p == q:
-        q = generate_prime(bits // 2)
+class PrivateKey(tuple):
+    """RSA private key that still behaves as the (d, n) tuple, plus the CRT parameters.
+
+    dP = d mod (p - 1), dQ = d mod (q - 1) and qInv = q^-1 mod p let private
+    operations use two half-size exponentiations instead of one full-size one.
+    """
+
+    def __new__(cls, d, n, p, q, e=65537):
+        key = super().__new__(cls, (d, n))
+        key.d = d
+        key.n = n
+        key.e = e
+        key.p = p
+        key.q = q
+        key.dP = d % (p - 1)
+        key.dQ = d % (q - 1)
+        key.qInv = pow(q, -1, p)
+        return key
+
+    def __getnewargs__(self):
+        return (self.d, self.n, self.p, self.q, self.e)
+
+def generate_keypair(bits, workers=None):
+    """Generate an RSA keypair; with workers > 1 the prime search is raced on a process pool."""
+    e = PUBLIC_EXPONENT
+    executor = ProcessPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        def next_prime():
+            while True:
+                if executor:
+                    prime = generate_prime_parallel(bits // 2, executor, workers)
+                else:
+                    prime = generate_prime(bits // 2)
+                if prime % e != 1:  # e must be invertible mod p - 1
+                    return prime
+
+        p = next_prime()
+        q = next_prime()
+        while p == q:
+            q = next_prime()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
     n = p * q
     phi = (p - 1) * (q - 1)
-    e = 65537
     d = modinv(e, phi)
-    return ((e, n), (d, n))
+    return ((e, n), PrivateKey(d, n, p, q, e))
+
+def crt_pow(private_key, c):
+    """Compute c^d mod n from the CRT parameters (Garner's recombination)."""
+    m1 = pow(c, private_key.dP, private_key.p)
+    m2 = pow(c, private_key.dQ, private_key.q)
+    h = (private_key.qInv * (m1 - m2)) % private_key.p
+    return m2 + h * private_key.q
+
+def private_op(private_key, c, blinding=True):
+    """Raise c to the private exponent.
+
+    PrivateKey objects use CRT, blinded by a random r (c * r^e is exponentiated
+    and the result multiplied by r^-1) so timing does not depend on c. Plain
+    (d, n) tuples fall back to a full-size pow.
+    """
+    if not isinstance(private_key, PrivateKey):
+        d, n = private_key
+        return pow(c, d, n)
+    if not blinding:
+        return crt_pow(private_key, c)
+    n = private_key.n
+    while True:
+        r = secrets.randbelow(n - 3) + 2  # Secret: a predictable r would undo the blinding
+        if gcd(r, n) == 1:
+            break
+    blinded = (c * pow(r, private_key.e, n)) % n
+    return (crt_pow(private_key, blinded) * pow(r, -1, n)) % n
+
+def sign(private_key, message):
+    """Sign the SHA-256 digest of message with the private key."""
+    if isinstance(message, str):
+        message = message.encode()
+    n = private_key[1]
+    digest = int.from_bytes(hashlib.sha256(message).digest(), byteorder='big') % n
+    return private_op(private_key, digest)
+
+def verify(public_key, message, signature):
+    e, n = public_key
+    if isinstance(message, str):
+        message = message.encode()
+    digest = int.from_bytes(hashlib.sha256(message).digest(), byteorder='big') % n
+    return pow(signature, e, n) == digest
 
 def encrypt(public_key, plaintext):
   
@@ -81,25 +246,210 @@ def encrypt(public_key, plaintext):
     return ' '.join(ciphertext_chunks)
 
 def decrypt(private_key, ciphertext):
-    
-    d, n = private_key
+    """Decrypt the space-separated decimal format.
+
+    Every chunk but the last was exactly max_size bytes, so those are padded
+    back to that width and keep their leading zero bytes. The format does
+    not record the last chunk's length, so leading zeros of the last chunk
+    are lost (b"\\x00\\x01" comes back as b"\\x01"); use the binary formats
+    for exact round trips. The output is joined once at the end instead of
+    grown chunk by chunk.
+    """
+    n = private_key[1]
+    max_size = (n.bit_length() // 8) - 1
     ciphertext_chunks = ciphertext.split()
-    decrypted_bytes = b""
-    for chunk in ciphertext_chunks:
+    decrypted_chunks = []
+    for i, chunk in enumerate(ciphertext_chunks):
         chunk_int = int(chunk)
-        plaintext_int = pow(chunk_int, d, n)
-        decrypted_bytes += plaintext_int.to_bytes((plaintext_int.bit_length() + 7) // 8, byteorder='big')
-    return decrypted_bytes
-
-def file_encrypt_decrypt(input_file, output_file, key, mode='encrypt'):
-    """Encrypt or decrypt a file."""
-    with open(input_file, 'rb') as f:
-        data = f.read()
+        plaintext_int = private_op(private_key, chunk_int)
+        if i < len(ciphertext_chunks) - 1:
+            length = max_size
+        else:
+            length = (plaintext_int.bit_length() + 7) // 8
+        decrypted_chunks.append(plaintext_int.to_bytes(length, byteorder='big'))
+    return b"".join(decrypted_chunks)
+
+def block_width(n):
+    """Ciphertext block width k and the plaintext bytes that fit in one block (k - 1)."""
+    k = (n.bit_length() + 7) // 8
+    return k, k - 1
+
+def encrypt_blocks(public_key, src, dst):
+    """Stream src into dst as fixed-width blocks: 2-byte plaintext length + k-byte ciphertext."""
+    e, n = public_key
+    k, max_size = block_width(n)
+    while True:
+        chunk = src.read(max_size)
+        if not chunk:
+            break
+        chunk_int = int.from_bytes(chunk, byteorder='big')
+        dst.write(BLOCK_LENGTH.pack(len(chunk)))
+        dst.write(pow(chunk_int, e, n).to_bytes(k, byteorder='big'))
+
+def decrypt_blocks(private_key, src, dst):
+    """Stream fixed-width blocks from src into dst, restoring each chunk at its recorded length."""
+    n = private_key[1]
+    k, max_size = block_width(n)
+    stride = BLOCK_LENGTH.size + k
+    while True:
+        block = src.read(stride)
+        if not block:
+            break
+        if len(block) != stride:
+            raise ValueError("Encrypted file is truncated.")
+        length = BLOCK_LENGTH.unpack_from(block)[0]
+        if length > max_size:
+            raise ValueError("Corrupt block length.")
+        plaintext_int = private_op(private_key, int.from_bytes(block[BLOCK_LENGTH.size:], byteorder='big'))
+        dst.write(plaintext_int.to_bytes(length, byteorder='big'))
+
+def encrypt_binary(public_key, plaintext):
+    """In-memory version of encrypt_blocks."""
+    if isinstance(plaintext, str):
+        plaintext = plaintext.encode()
+    dst = io.BytesIO()
+    encrypt_blocks(public_key, io.BytesIO(plaintext), dst)
+    return dst.getvalue()
+
+def decrypt_binary(private_key, ciphertext):
+    """In-memory version of decrypt_blocks."""
+    dst = io.BytesIO()
+    decrypt_blocks(private_key, io.BytesIO(ciphertext), dst)
+    return dst.getvalue()
+
+def kem_encapsulate(public_key):
+    """RSA-KEM: encrypt a random r < n and derive the AES key from it. Returns (key, ciphertext bytes)."""
+    e, n = public_key
+    k = (n.bit_length() + 7) // 8
+    r = secrets.randbelow(n - 2) + 2
+    key = hashlib.sha256(r.to_bytes(k, byteorder='big')).digest()
+    return key, pow(r, e, n).to_bytes(k, byteorder='big')
+
+def kem_decapsulate(private_key, ciphertext):
+    n = private_key[1]
+    k = (n.bit_length() + 7) // 8
+    r = private_op(private_key, int.from_bytes(ciphertext, byteorder='big'))
+    return hashlib.sha256(r.to_bytes(k, byteorder='big')).digest()
+
+def run_cipher(context, src, dst, length):
+    """Stream exactly length bytes from src through an AES-GCM context into dst."""
+    buffer = bytearray(CHUNK_SIZE)
+    view = memoryview(buffer)
+    while length:
+        n = src.readinto(view[:min(CHUNK_SIZE, length)])
+        if not n:
+            raise ValueError("Encrypted file is truncated.")
+        dst.write(context.update(view[:n]))
+        length -= n
+    dst.write(context.finalize())
+
+def hybrid_encrypt_file(input_file, output_file, public_key):
+    """Wrap a fresh AES-256 key with RSA once, then stream the file through AES-GCM.
+
+    Layout: header, KEM ciphertext length + bytes, nonce, ciphertext, tag.
+    The header, KEM ciphertext and nonce are authenticated as AAD.
+    """
+    key, kem_ciphertext = kem_encapsulate(public_key)
+    nonce = os.urandom(NONCE_LENGTH)
+    header = (FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, SCHEME_HYBRID)
+              + KEM_HEADER.pack(len(kem_ciphertext)) + kem_ciphertext + nonce)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+    encryptor.authenticate_additional_data(header)
+    with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+        dst.write(header)
+        run_cipher(encryptor, src, dst, os.fstat(src.fileno()).st_size)
+        dst.write(encryptor.tag)
+
+def write_atomically(function, path):
+    """Run function(file) into path + ".partial", then fsync and rename it into place.
+
+    If function raises, only the partial file is removed: a file already at
+    path is left as it was, and no unauthenticated plaintext is kept.
+    """
+    partial_path = path + ".partial"
+    try:
+        with open(partial_path, 'wb') as f:
+            function(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(partial_path, path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+def read_struct(src, header):
+    """Read and unpack one struct from src, raising ValueError if the file ends first."""
+    data = src.read(header.size)
+    if len(data) != header.size:
+        raise ValueError("Encrypted file is truncated.")
+    return header.unpack(data)
+
+def hybrid_decrypt_file(src, output_file, private_key, prefix):
+    """Decrypt the rest of a hybrid file whose FILE_HEADER (prefix) was already read from src.
+
+    The plaintext is written through write_atomically, so output_file only
+    appears (or changes) once the tag has been verified.
+    """
+    kem_length = read_struct(src, KEM_HEADER)[0]
+    kem_ciphertext = src.read(kem_length)
+    nonce = src.read(NONCE_LENGTH)
+    header = prefix + KEM_HEADER.pack(kem_length) + kem_ciphertext + nonce
+    payload_length = os.fstat(src.fileno()).st_size - len(header) - TAG_LENGTH
+    if len(kem_ciphertext) != kem_length or len(nonce) != NONCE_LENGTH or payload_length < 0:
+        raise ValueError("Encrypted file is truncated.")
+    key = kem_decapsulate(private_key, kem_ciphertext)
+    src.seek(len(header) + payload_length)
+    tag = src.read(TAG_LENGTH)
+    src.seek(len(header))
+    decryptor = Cipher(algorithms.AES(key), modes.GCM(nonce, tag)).decryptor()
+    decryptor.authenticate_additional_data(header)
+    write_atomically(lambda dst: run_cipher(decryptor, src, dst, payload_length), output_file)
+
+def file_encrypt_decrypt(input_file, output_file, key, mode='encrypt', scheme='hybrid'):
+    """Encrypt or decrypt a file.
+
+    scheme='hybrid' (default) writes the RSA-KEM + AES-GCM format, 'chunked'
+    streams RSA-per-chunk binary blocks and 'text' writes the original
+    space-separated decimal chunks. Decryption detects the format from the
+    file itself.
+    """
     if mode == 'encrypt':
-        processed_data = encrypt(key, data)
-        with open(output_file, 'w') as f:
-            f.write(processed_data)
+        if scheme == 'hybrid':
+            hybrid_encrypt_file(input_file, output_file, key)
+        elif scheme == 'chunked':
+            k, _ = block_width(key[1])
+            with open(input_file, 'rb') as src, open(output_file, 'wb') as dst:
+                dst.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, SCHEME_CHUNKED) + BLOCK_HEADER.pack(k))
+                encrypt_blocks(key, src, dst)
+        elif scheme == 'text':
+            with open(input_file, 'rb') as f:
+                data = f.read()
+            processed_data = encrypt(key, data)
+            with open(output_file, 'w') as f:
+                f.write(processed_data)
+        else:
+            raise ValueError("Invalid scheme. Use 'hybrid', 'chunked' or 'text'.")
     elif mode == 'decrypt':
+        with open(input_file, 'rb') as f:
+            prefix = f.read(FILE_HEADER.size)
+            if prefix[:len(FILE_MAGIC)] == FILE_MAGIC:
+                if len(prefix) != FILE_HEADER.size:
+                    raise ValueError("Encrypted file is truncated.")
+                _, version, file_scheme = FILE_HEADER.unpack(prefix)
+                if version != FILE_VERSION:
+                    raise ValueError(f"Unsupported file version {version}.")
+                if file_scheme == SCHEME_HYBRID:
+                    hybrid_decrypt_file(f, output_file, key, prefix)
+                elif file_scheme == SCHEME_CHUNKED:
+                    k = read_struct(f, BLOCK_HEADER)[0]
+                    if k != block_width(key[1])[0]:
+                        raise ValueError("File was encrypted for a different key size.")
+                    with open(output_file, 'wb') as dst:
+                        decrypt_blocks(key, f, dst)
+                else:
+                    raise ValueError(f"Unsupported scheme {file_scheme}.")
+                return
         with open(input_file, 'r') as f:
             encrypted_data = f.read()
         processed_data = decrypt(key, encrypted_data)
@@ -108,51 +458,167 @@ def file_encrypt_decrypt(input_file, output_file, key, mode='encrypt'):
     else:
         raise ValueError("Invalid mode. Use 'encrypt' or 'decrypt'.")
 
-def performance_test():
-    bits = 2048
-    public_key, private_key = generate_keypair(bits)
-    message_sizes = [64, 128, 256, 512, 1024, 2048]
-    encryption_times = []
-    decryption_times = []
-    memory_usages = []
-    cpu_usages = []
-    for size in message_sizes:
-        message = b'a' * size
-        start_time = time.time()
-        ciphertext = encrypt(public_key, message)
-        encryption_times.append(time.time() - start_time)
-        start_time = time.time()
-        decrypted_message = decrypt(private_key, ciphertext)
-        decryption_times.append(time.time() - start_time)
-        memory_usages.append(psutil.Process().memory_info().rss / 1024 / 1024)
-        cpu_usages.append(psutil.cpu_percent(interval=1))
-    plt.figure(figsize=(12, 8))
-    plt.subplot(2, 2, 1)
-    plt.plot(message_sizes, encryption_times, marker='o')
-    plt.title('Encryption Time vs Message Size')
-    plt.xlabel('Message Size (bytes)')
-    plt.ylabel('Time (seconds)')
-    plt.subplot(2, 2, 2)
-    plt.plot(message_sizes, decryption_times, marker='o')
-    plt.title('Decryption Time vs Message Size')
-    plt.xlabel('Message Size (bytes)')
-    plt.ylabel('Time (seconds)')
-    plt.subplot(2, 2, 3)
-    plt.plot(message_sizes, memory_usages, marker='o')
-    plt.title('Memory Usage vs Message Size')
-    plt.xlabel('Message Size (bytes)')
-    plt.ylabel('Memory Usage (MB)')
-    plt.subplot(2, 2, 4)
-    plt.plot(message_sizes, cpu_usages, marker='o')
-    plt.title('CPU Usage vs Message Size')
-    plt.xlabel('Message Size (bytes)')
-    plt.ylabel('CPU Usage (%)')
-    plt.tight_layout()
-    plt.show()
+def serialize_keypair(public_key, private_key):
+    """Pack a keypair as KEY_HEADER followed by length-prefixed big-endian e, n, d, p, q."""
+    e, n = public_key
+    d = private_key[0]
+    parts = [KEY_HEADER.pack(KEY_MAGIC, KEY_VERSION)]
+    for value in (e, n, d, private_key.p, private_key.q):
+        raw = value.to_bytes((value.bit_length() + 7) // 8, byteorder='big')
+        parts.append(INT_LENGTH.pack(len(raw)))
+        parts.append(raw)
+    return b"".join(parts)
+
+class StoredKey:
+    """A serialised keypair parsed lazily: the public half is decoded on first
+    use, the private half (and its CRT parameters) only when it is needed."""
+
+    def __init__(self, data):
+        magic, version = KEY_HEADER.unpack_from(data)
+        if magic != KEY_MAGIC or version != KEY_VERSION:
+            raise ValueError("Not a key store file.")
+        self._data = data
+
+    def _read_ints(self, count):
+        values = []
+        offset = KEY_HEADER.size
+        for _ in range(count):
+            length = INT_LENGTH.unpack_from(self._data, offset)[0]
+            offset += INT_LENGTH.size
+            values.append(int.from_bytes(self._data[offset:offset + length], byteorder='big'))
+            offset += length
+        return values
+
+    @cached_property
+    def public_key(self):
+        e, n = self._read_ints(2)
+        return (e, n)
+
+    @cached_property
+    def private_key(self):
+        e, n, d, p, q = self._read_ints(5)
+        return PrivateKey(d, n, p, q, e)
+
+    def keypair(self):
+        return self.public_key, self.private_key
+
+class KeyStore:
+    """Directory of <name>.key files in the serialize_keypair format."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name + ".key")
+
+    def save(self, name, public_key, private_key):
+        """Write atomically (temp file + fsync + rename) so a crash never leaves half a key.
+
+        The file is created readable by the owner only, since it holds the private key.
+        """
+        path = self.path(name)
+        fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(serialize_keypair(public_key, private_key))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+    def load(self, name):
+        with open(self.path(name), 'rb') as f:
+            return StoredKey(f.read())
+
+    def names(self):
+        return sorted(name[:-len(".key")] for name in os.listdir(self.directory) if name.endswith(".key"))
+
+    def load_or_generate(self, name, bits):
+        """Return the stored keypair, generating and saving it on first use."""
+        if os.path.exists(self.path(name)):
+            return self.load(name).keypair()
+        public_key, private_key = generate_keypair(bits)
+        self.save(name, public_key, private_key)
+        return public_key, private_key
+
+class KeyPool:
+    """Keeps size fresh keypairs ready, generated in background worker processes.
+
+    get() hands out a ready keypair immediately (a hit); if none is ready it
+    generates one inline (a miss). Every get() tops the pool back up
+    asynchronously. metrics() reports hits, misses and refill times.
+    """
+
+    def __init__(self, bits, size=4, workers=None):
+        self.bits = bits
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.refills = 0
+        self.refill_seconds = 0.0
+        self._ready = deque()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._executor = ProcessPoolExecutor(max_workers=workers or min(size, os.cpu_count() or 1))
+        self._closed = False
+        self._refill()
+
+    def _refill(self):
+        with self._lock:
+            missing = self.size - len(self._ready) - self._in_flight
+            if self._closed or missing <= 0:
+                return
+            self._in_flight += missing
+        for _ in range(missing):
+            started = time.perf_counter()
+            future = self._executor.submit(generate_keypair, self.bits)
+            future.add_done_callback(lambda f, started=started: self._on_generated(f, started))
+
+    def _on_generated(self, future, started):
+        with self._lock:
+            self._in_flight -= 1
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._ready.append(future.result())
+            self.refills += 1
+            self.refill_seconds += time.perf_counter() - started
+
+    def get(self):
+        with self._lock:
+            keypair = self._ready.popleft() if self._ready else None
+            if keypair is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if keypair is None:
+            keypair = generate_keypair(self.bits)
+        self._refill()
+        return keypair
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "ready": len(self._ready),
+                "in_flight": self._in_flight,
+                "refills": self.refills,
+                "mean_refill_seconds": self.refill_seconds / self.refills if self.refills else 0.0,
+            }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 def main():
     bits = 2048
-    public_key, private_key = generate_keypair(bits)
+    public_key, private_key = KeyStore("keys").load_or_generate("default", bits)
     print("Public Key:", public_key)
     print("Private Key:", private_key)
     input_file = 'input.txt'
@@ -162,7 +628,6 @@ def main():
     print(f"File '{input_file}' encrypted to '{encrypted_file}'.")
     file_encrypt_decrypt(encrypted_file, decrypted_file, private_key, mode='decrypt')
     print(f"File '{encrypted_file}' decrypted to '{decrypted_file}'.")
-    performance_test()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,265 @@
+import os
+import sys
+import math
+import mmap
+import time
+import struct
+import heapq
+import hashlib
+import argparse
+import tempfile
+
+# Bloom filter file: header, then the bit array. Bit i of the filter is bit (i % 8) of byte i // 8.
+BLOOM_MAGIC = b"\x89BLM"
+BLOOM_VERSION = 1
+BLOOM_HEADER = struct.Struct(">4sBBQQ")  # magic, version, hash count k, bit count m, entry count n
+# Exact file: header, then sorted 8-byte BLAKE2b digests of every entry
+EXACT_MAGIC = b"\x89BLX"
+EXACT_VERSION = 1
+EXACT_HEADER = struct.Struct(">4sBQ")  # magic, version, entry count
+DIGEST_SIZE = 8
+DEFAULT_FP_RATE = 0.001
+SORT_RUN_LENGTH = 4_000_000  # Digests sorted in memory at a time when building the exact file
+
+
+def entry_hashes(word):
+    """Two 64-bit hashes of a password for double hashing (h1 + i * h2)."""
+    digest = hashlib.blake2b(word.encode("utf-8", errors="surrogateescape"), digest_size=16).digest()
+    h1, h2 = struct.unpack(">QQ", digest)
+    return h1, h2 | 1  # An odd step never collapses onto the same bit
+
+
+def exact_digest(word):
+    return hashlib.blake2b(word.encode("utf-8", errors="surrogateescape"), digest_size=DIGEST_SIZE,
+                           person=b"exact").digest()
+
+
+def bloom_parameters(entries, fp_rate):
+    """Optimal bit count m and hash count k for entries at the target false-positive rate."""
+    entries = max(entries, 1)
+    bits = max(8, math.ceil(-entries * math.log(fp_rate) / math.log(2) ** 2))
+    hashes = max(1, round(bits / entries * math.log(2)))
+    return bits, hashes
+
+
+def read_words(path):
+    """Passwords from a wordlist, one per line, stripped like the validator's input."""
+    with open(path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        for line in f:
+            word = line.strip()
+            if word:
+                yield word
+
+
+def build(wordlist_path, bloom_path, fp_rate=DEFAULT_FP_RATE, exact_path=None):
+    """Compile a wordlist into a Bloom filter file (and optionally the exact sorted-digest file).
+
+    The wordlist is streamed twice (once to count it) and never held in
+    memory; only the bit array is. Exact digests are sorted in runs of
+    SORT_RUN_LENGTH and merged from disk. Returns the number of entries.
+    """
+    entries = sum(1 for _ in read_words(wordlist_path))
+    bits, hashes = bloom_parameters(entries, fp_rate)
+    array = bytearray((bits + 7) // 8)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(exact_path or bloom_path))) as tmpdir:
+        runs, digests = [], []
+        for word in read_words(wordlist_path):
+            h1, h2 = entry_hashes(word)
+            for i in range(hashes):
+                bit = (h1 + i * h2) % bits
+                array[bit >> 3] |= 1 << (bit & 7)
+            if exact_path:
+                digests.append(exact_digest(word))
+                if len(digests) >= SORT_RUN_LENGTH:
+                    runs.append(write_run(tmpdir, len(runs), digests))
+                    digests = []
+
+        write_atomically(bloom_path, BLOOM_HEADER.pack(BLOOM_MAGIC, BLOOM_VERSION, hashes, bits, entries), [array])
+        if exact_path:
+            if digests:
+                runs.append(write_run(tmpdir, len(runs), digests))
+            merge_runs(runs, exact_path)
+    return entries
+
+
+def write_run(directory, index, digests):
+    path = os.path.join(directory, f"run-{index}")
+    digests.sort()
+    with open(path, "wb") as f:
+        f.write(b"".join(digests))
+    return path
+
+
+def read_run(path):
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(DIGEST_SIZE * 65536)
+            if not block:
+                return
+            for start in range(0, len(block), DIGEST_SIZE):
+                yield block[start:start + DIGEST_SIZE]
+
+
+def merge_runs(runs, exact_path):
+    """Merge sorted runs into the exact file, dropping duplicate entries."""
+    count, previous = 0, None
+    with open(exact_path + ".tmp", "wb") as f:
+        f.write(EXACT_HEADER.pack(EXACT_MAGIC, EXACT_VERSION, 0))
+        for digest in heapq.merge(*(read_run(run) for run in runs)):
+            if digest != previous:
+                f.write(digest)
+                count += 1
+                previous = digest
+        f.seek(0)
+        f.write(EXACT_HEADER.pack(EXACT_MAGIC, EXACT_VERSION, count))
+    os.replace(exact_path + ".tmp", exact_path)
+
+
+def write_atomically(path, header, chunks):
+    with open(path + ".tmp", "wb") as f:
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(path + ".tmp", path)
+
+
+class Blocklist:
+    """Memory-mapped membership test: `password in blocklist`.
+
+    The Bloom filter answers most lookups with k bit probes. If an exact file
+    is given, Bloom hits are confirmed by binary search over its sorted
+    digests, which removes the filter's false positives.
+    """
+
+    def __init__(self, bloom_path, exact_path=None):
+        self.bloom_path = bloom_path
+        self.exact_path = exact_path
+        with open(bloom_path, "rb") as f:
+            self._bloom = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.hashes, self.bits, self.entries = BLOOM_HEADER.unpack_from(self._bloom)
+        if magic != BLOOM_MAGIC or version != BLOOM_VERSION:
+            raise ValueError(f"{bloom_path} is not a Bloom filter file.")
+        self._exact = None
+        if exact_path:
+            with open(exact_path, "rb") as f:
+                self._exact = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.exact_entries = EXACT_HEADER.unpack_from(self._exact)
+            if magic != EXACT_MAGIC or version != EXACT_VERSION:
+                raise ValueError(f"{exact_path} is not an exact blocklist file.")
+
+    def __reduce__(self):
+        # Worker processes reopen the maps instead of pickling them
+        return (Blocklist, (self.bloom_path, self.exact_path))
+
+    def might_contain(self, word):
+        h1, h2 = entry_hashes(word)
+        bloom, bits, offset = self._bloom, self.bits, BLOOM_HEADER.size
+        for i in range(self.hashes):
+            bit = (h1 + i * h2) % bits
+            if not bloom[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _exact_contains(self, word):
+        target = exact_digest(word)
+        exact, low, high = self._exact, 0, self.exact_entries
+        while low < high:
+            middle = (low + high) // 2
+            start = EXACT_HEADER.size + middle * DIGEST_SIZE
+            value = exact[start:start + DIGEST_SIZE]
+            if value < target:
+                low = middle + 1
+            elif value > target:
+                high = middle
+            else:
+                return True
+        return False
+
+    def __contains__(self, word):
+        if not self.might_contain(word):
+            return False
+        return self._exact is None or self._exact_contains(word)
+
+    def close(self):
+        self._bloom.close()
+        if self._exact is not None:
+            self._exact.close()
+
+
+def benchmark(entries=1_000_000, fp_rate=DEFAULT_FP_RATE, probes=200_000):
+    """Build a filter from random words and print build time, file size, lookup latency and observed FP rate."""
+    with tempfile.TemporaryDirectory() as tmpdir:
+        wordlist = os.path.join(tmpdir, "words.txt")
+        with open(wordlist, "w") as f:
+            for i in range(entries):
+                f.write(f"breached-{i:x}-{os.urandom(4).hex()}\n")
+        bloom_path = os.path.join(tmpdir, "words.bloom")
+        exact_path = os.path.join(tmpdir, "words.exact")
+
+        start = time.perf_counter()
+        build(wordlist, bloom_path, fp_rate, exact_path)
+        build_seconds = time.perf_counter() - start
+
+        blocklist = Blocklist(bloom_path)
+        members = list(read_words(wordlist))[:probes]
+        outsiders = [f"clean-{i}-{os.urandom(4).hex()}" for i in range(probes)]
+
+        start = time.perf_counter()
+        missed = sum(1 for word in members if word not in blocklist)
+        hit_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        false_positives = sum(1 for word in outsiders if word in blocklist)
+        miss_seconds = time.perf_counter() - start
+        blocklist.close()
+
+        exact = Blocklist(bloom_path, exact_path)
+        start = time.perf_counter()
+        exact_false_positives = sum(1 for word in outsiders if word in exact)
+        exact_seconds = time.perf_counter() - start
+        exact.close()
+
+        print(f"Entries: {entries:,}, target FP rate {fp_rate}")
+        print(f"Build time: {build_seconds:.2f} s")
+        print(f"Bloom file: {os.path.getsize(bloom_path) / 2**20:.2f} MB, "
+              f"exact file: {os.path.getsize(exact_path) / 2**20:.2f} MB")
+        print(f"Lookup (member): {hit_seconds / len(members) * 1e6:.2f} us, missed members: {missed}")
+        print(f"Lookup (non-member): {miss_seconds / len(outsiders) * 1e6:.2f} us, "
+              f"observed FP rate {false_positives / len(outsiders):.5f}")
+        print(f"Lookup with exact file (non-member): {exact_seconds / len(outsiders) * 1e6:.2f} us, "
+              f"false positives: {exact_false_positives}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Breached-password blocklist")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="compile a wordlist into a Bloom filter file")
+    build_parser.add_argument("wordlist")
+    build_parser.add_argument("output")
+    build_parser.add_argument("--fp-rate", type=float, default=DEFAULT_FP_RATE)
+    build_parser.add_argument("--exact", help="also write the exact sorted-digest file here")
+
+    check_parser = subparsers.add_parser("check", help="look passwords up in a filter")
+    check_parser.add_argument("bloom")
+    check_parser.add_argument("passwords", nargs="+")
+    check_parser.add_argument("--exact")
+
+    bench_parser = subparsers.add_parser("benchmark", help="build and probe a random filter")
+    bench_parser.add_argument("--entries", type=int, default=1_000_000)
+    bench_parser.add_argument("--fp-rate", type=float, default=DEFAULT_FP_RATE)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        start = time.perf_counter()
+        entries = build(args.wordlist, args.output, args.fp_rate, args.exact)
+        print(f"Built {args.output} from {entries:,} entries in {time.perf_counter() - start:.2f} s.")
+    elif args.command == "check":
+        blocklist = Blocklist(args.bloom, args.exact)
+        for password in args.passwords:
+            print(f"{password}: {'blocked' if password in blocklist else 'not found'}")
+    else:
+        benchmark(args.entries, args.fp_rate)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
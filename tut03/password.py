@@ -1,81 +1,189 @@
+import os
 import re
-
-def validate_password(password, criteria):
-    if len(password) < 8:
-        print(f"Password '{password}' is too short (less than 8 characters). Skipping.")
-        return False  # Indicate skip, but don't count as invalid yet
-
-    valid = True
-
-    if 1 in criteria:  # Uppercase
-        if not re.search(r"[A-Z]", password):
-            valid = False
-    if 2 in criteria:  # Lowercase
-        if not re.search(r"[a-z]", password):
-            valid = False
-    if 3 in criteria:  # Numbers
-        if not re.search(r"[0-9]", password):
-            valid = False
-    if 4 in criteria:  # Special characters (!, @, #)
-        if not re.search(r"^[a-zA-Z0-9!@#]*$", password):  # Check only allowed special chars
-            valid = False
-        if password.count('!') + password.count('@') + password.count('#') > 3:
-            valid = False
-
-    return valid
-
-
-# Part 2: Password Validator with Skip from user input
-def validate_from_input():
-    criteria = list(map(int, input("Enter criteria numbers (1-4, comma-separated): ").split(",")))
-
-    num_passwords = int(input("Enter the number of passwords to check: "))
-    password_list = []
-    for i in range(num_passwords):
-        password = input(f"Enter password {i+1}: ")
-        password_list.append(password)
-
-    for password in password_list:
-        if validate_password(password, criteria):
-            print(f"Password '{password}' is valid.")
-        elif len(password) >= 8:  # Only print invalid if length is sufficient.
-            print(f"Password '{password}' is invalid.")
-
-
-# Part 3: Password Validator with Skip from input file input.txt
-def validate_from_file():
-    try:
-        with open("input.txt", "r") as f:
-            passwords = [line.strip() for line in f]
-    except FileNotFoundError:
-        print("Error: input.txt not found. Create the file with passwords.")
-        return
-
-    criteria = list(map(int, input("Enter criteria numbers (1-4, comma-separated): ").split(",")))
-    valid_count = 0
-    invalid_count = 0
-    skipped_count = 0
-
-    for password in passwords:
-        result = validate_password(password, criteria)
-        if result is True:
-            valid_count += 1
-        elif result is False and len(password) >= 8:  # Only count as invalid if length is sufficient.
-            invalid_count += 1
-        else:  # Implicitly handles the skipped passwords
-            skipped_count += 1
-
-    print(f"Total Valid Passwords: {valid_count}")
-    print(f"Total Invalid Passwords: {invalid_count}")
-    print(f"Total Skipped Passwords: {skipped_count}")
-
-
-# Choose which part to run:
-choice = input("Enter 1 for input validation or 2 for file validation: ")
-
-if choice == "1":
-    validate_from_input()
-elif choice == "2":
-    validate_from_file()
-else:
-    print("Invalid choice.")
\ No newline at end of file
+import mmap
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+MIN_LENGTH = 8
+VALID = "valid"
+INVALID = "invalid"
+SKIPPED = "skipped"
+SHARD_SIZE = 16 * 1024 * 1024  # Bytes of the input handled per task; bounds worker memory
+
+# Rule number -> (name, lookahead used in the combined pattern, pattern used to explain a failure)
+RULES = {
+    1: ("uppercase", r"(?=.*[A-Z])", re.compile(r"[A-Z]")),
+    2: ("lowercase", r"(?=.*[a-z])", re.compile(r"[a-z]")),
+    3: ("number", r"(?=.*[0-9])", re.compile(r"[0-9]")),
+    # Special characters: only !, @ and # are allowed, and at most three of them
+    4: ("special", r"(?=[a-zA-Z0-9!@#]*$)(?!(?:[^!@#]*[!@#]){4})", re.compile(r"[a-zA-Z0-9!@#]*$")),
+    # Not in the breached-password blocklist; checked against the validator's Blocklist, not a pattern
+    5: ("blocklist", None, None),
+}
+BLOCKLIST_RULE = 5
+
+ValidationResult = namedtuple("ValidationResult", ["status", "failed_rules"])
+
+
+class PasswordValidator:
+    """Checks passwords against a set of rule numbers (1-5).
+
+    All character rules are compiled once into a single anchored pattern, so a
+    valid password costs one regex match. Rule 5 needs a blocklist (anything
+    supporting `password in blocklist`, such as blocklist.Blocklist) and is
+    only consulted for passwords that pass the pattern. Only passwords that
+    fail are looked at rule by rule to report which rules they broke.
+    """
+
+    def __init__(self, criteria, blocklist=None):
+        self.criteria = tuple(sorted(set(criteria)))
+        unknown = [rule for rule in self.criteria if rule not in RULES]
+        if unknown:
+            raise ValueError(f"Unknown criteria: {unknown}")
+        if BLOCKLIST_RULE in self.criteria and blocklist is None:
+            raise ValueError(f"Rule {BLOCKLIST_RULE} needs a blocklist")
+        self.blocklist = blocklist if BLOCKLIST_RULE in self.criteria else None
+        self._pattern = re.compile("".join(RULES[rule][1] for rule in self.criteria if RULES[rule][1]), re.DOTALL)
+
+    def _passes(self, password):
+        if self._pattern.match(password) is None:
+            return False
+        return self.blocklist is None or password not in self.blocklist
+
+    def is_valid(self, password):
+        """True if the password is long enough and passes every rule."""
+        return len(password) >= MIN_LENGTH and self._passes(password)
+
+    def failed_rules(self, password):
+        """Rule numbers the password breaks (length is not a rule)."""
+        failed = []
+        for rule in self.criteria:
+            if rule == BLOCKLIST_RULE:
+                ok = password not in self.blocklist
+            elif rule == 4:
+                ok = (RULES[4][2].match(password) is not None
+                      and password.count('!') + password.count('@') + password.count('#') <= 3)
+            else:
+                ok = RULES[rule][2].search(password) is not None
+            if not ok:
+                failed.append(rule)
+        return tuple(failed)
+
+    def classify(self, password):
+        """Return a ValidationResult with status VALID, INVALID or SKIPPED (too short)."""
+        if len(password) < MIN_LENGTH:
+            return ValidationResult(SKIPPED, ())
+        if self._passes(password):
+            return ValidationResult(VALID, ())
+        return ValidationResult(INVALID, self.failed_rules(password))
+
+    def count(self, passwords):
+        """Return {VALID: n, INVALID: n, SKIPPED: n} for an iterable of passwords."""
+        valid = invalid = skipped = 0
+        match = self._pattern.match if self.blocklist is None else self._passes
+        for password in passwords:
+            if len(password) < MIN_LENGTH:
+                skipped += 1
+            elif match(password):
+                valid += 1
+            else:
+                invalid += 1
+        return {VALID: valid, INVALID: invalid, SKIPPED: skipped}
+
+
+@lru_cache(maxsize=16)
+def get_validator(criteria, blocklist=None):
+    """Compiled validator for a tuple of rule numbers, built once per distinct criteria and blocklist."""
+    return PasswordValidator(criteria, blocklist)
+
+
+def validate_password(password, criteria, blocklist=None):
+    """True if the password is valid; too-short passwords return False (check classify for skips).
+
+    Rule 5 rejects passwords found in blocklist, e.g. blocklist.Blocklist("breached.bloom").
+    """
+    return get_validator(tuple(sorted(set(criteria))), blocklist).is_valid(password)
+
+
+def classify_password(password, criteria, blocklist=None):
+    return get_validator(tuple(sorted(set(criteria))), blocklist).classify(password)
+
+
+def split_lines(text):
+    """Split like iterating a text-mode file (universal newlines) and strip each line."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()  # The text ended with a newline
+    return [line.strip() for line in lines]
+
+
+def shard_bounds(path, shard_size=SHARD_SIZE):
+    """Byte ranges of roughly shard_size that start and end on line boundaries."""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    bounds = []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        start = 0
+        while start < size:
+            newline = mapped.find(b"\n", min(start + shard_size, size) - 1)
+            end = size if newline == -1 else newline + 1
+            bounds.append((start, end))
+            start = end
+    return bounds
+
+
+def count_shard(path, start, end, criteria, histogram=False, blocklist=None):
+    """Worker task: count one shard of the file, optionally tallying failed rules."""
+    validator = get_validator(criteria, blocklist)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        passwords = split_lines(mapped[start:end].decode("utf-8", errors="replace"))
+    counts = validator.count(passwords)
+    failures = Counter()
+    if histogram and counts[INVALID]:
+        for password in passwords:
+            result = validator.classify(password)
+            failures.update(result.failed_rules)
+    return counts, failures, end - start
+
+
+def count_file(path, criteria, workers=None, histogram=False, progress=None, blocklist=None):
+    """Count valid/invalid/skipped passwords in a file, one per line, on a process pool.
+
+    The file is memory-mapped and cut into newline-aligned shards of
+    SHARD_SIZE bytes. Each shard is counted by a worker and merged here, so
+    memory stays bounded whatever the file size and the counts match reading
+    the file line by line. With histogram=True, the result also has a
+    "failed_rules" Counter of rule number -> invalid passwords breaking it.
+    progress, if given, is called as progress(bytes_done, bytes_total).
+    A blocklist for rule 5 must be picklable; blocklist.Blocklist reopens its
+    maps in each worker.
+    """
+    criteria = tuple(sorted(set(criteria)))
+    get_validator(criteria, blocklist)  # Reject unknown criteria before starting workers
+    bounds = shard_bounds(path)
+    total_bytes = os.path.getsize(path)
+    totals = {VALID: 0, INVALID: 0, SKIPPED: 0}
+    failures = Counter()
+    done_bytes = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(count_shard, path, start, end, criteria, histogram, blocklist)
+                   for start, end in bounds]
+        for future in as_completed(futures):
+            counts, shard_failures, shard_bytes = future.result()
+            for status, count in counts.items():
+                totals[status] += count
+            failures.update(shard_failures)
+            done_bytes += shard_bytes
+            if progress:
+                progress(done_bytes, total_bytes)
+    if histogram:
+        totals["failed_rules"] = failures
+    return totals
+
+
+if __name__ == "__main__":
+    from password_cli import main
+    main()
@@ -0,0 +1,171 @@
+import sys
+import time
+import argparse
+import random
+import string
+from password import PasswordValidator, count_file, RULES, VALID, INVALID, SKIPPED
+from blocklist import Blocklist
+
+
+def read_validator():
+    """Prompt for criteria until they are valid rule numbers, then return their validator."""
+    while True:
+        try:
+            return PasswordValidator(map(int, input("Enter criteria numbers (1-4, comma-separated): ").split(",")))
+        except ValueError as e:
+            print(f"Invalid criteria ({e}). Enter numbers from 1 to 4, e.g. 1,2,4.")
+
+
+def report(password, result):
+    if result.status == SKIPPED:
+        print(f"Password '{password}' is too short (less than 8 characters). Skipping.")
+    elif result.status == VALID:
+        print(f"Password '{password}' is valid.")
+    else:
+        print(f"Password '{password}' is invalid.")
+
+
+# Part 2: Password Validator with Skip from user input
+def validate_from_input():
+    validator = read_validator()
+
+    num_passwords = int(input("Enter the number of passwords to check: "))
+    password_list = []
+    for i in range(num_passwords):
+        password = input(f"Enter password {i+1}: ")
+        password_list.append(password)
+
+    for password in password_list:
+        report(password, validator.classify(password))
+
+
+# Part 3: Password Validator with Skip from input file input.txt
+def validate_from_file(path="input.txt"):
+    try:
+        with open(path, "r") as f:
+            passwords = [line.strip() for line in f]
+    except FileNotFoundError:
+        print(f"Error: {path} not found. Create the file with passwords.")
+        return
+
+    validator = read_validator()
+    for password in passwords:
+        if len(password) < 8:
+            report(password, validator.classify(password))
+    counts = validator.count(passwords)
+
+    print(f"Total Valid Passwords: {counts[VALID]}")
+    print(f"Total Invalid Passwords: {counts[INVALID]}")
+    print(f"Total Skipped Passwords: {counts[SKIPPED]}")
+
+
+def generate_corpus(count, seed=0):
+    """Random passwords shaped like input.txt: 4-20 letters/digits with a few !@# mixed in."""
+    rng = random.Random(seed)
+    alphabet = string.ascii_letters + string.digits
+    corpus = []
+    for _ in range(count):
+        chars = rng.choices(alphabet, k=rng.randint(4, 20))
+        for _ in range(rng.choice((0, 0, 1, 2, 4))):
+            chars.insert(rng.randrange(len(chars) + 1), rng.choice("!@#"))
+        corpus.append("".join(chars))
+    return corpus
+
+
+def benchmark(count=2_000_000, criteria=(1, 2, 3, 4), path=None):
+    """Print passwords/s for counting and for full classification over a large corpus."""
+    if path:
+        with open(path, "r") as f:
+            passwords = [line.strip() for line in f]
+    else:
+        passwords = generate_corpus(count)
+    validator = PasswordValidator(criteria)
+
+    start = time.perf_counter()
+    counts = validator.count(passwords)
+    count_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for password in passwords:
+        validator.classify(password)
+    classify_seconds = time.perf_counter() - start
+
+    print(f"{len(passwords)} passwords, criteria {list(validator.criteria)}: {counts}")
+    print(f"count():    {len(passwords) / count_seconds:,.0f} passwords/s")
+    print(f"classify(): {len(passwords) / classify_seconds:,.0f} passwords/s")
+
+
+def audit(path, criteria, workers=None, histogram=False, show_progress=False, blocklist=None):
+    """Count a large password file on all cores and print totals, throughput and the rule histogram."""
+    def progress(done, total):
+        print(f"\r{done / total:6.1%} of {total / 2**20:.0f} MB", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    totals = count_file(path, criteria, workers, histogram, progress if show_progress else None, blocklist)
+    seconds = time.perf_counter() - start
+    if show_progress:
+        print(file=sys.stderr)
+
+    lines = totals[VALID] + totals[INVALID] + totals[SKIPPED]
+    print(f"Total Valid Passwords: {totals[VALID]}")
+    print(f"Total Invalid Passwords: {totals[INVALID]}")
+    print(f"Total Skipped Passwords: {totals[SKIPPED]}")
+    print(f"{lines / seconds:,.0f} passwords/s")
+    if histogram:
+        for rule, count in sorted(totals["failed_rules"].items()):
+            print(f"Failed rule {rule} ({RULES[rule][0]}): {count}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        parser = argparse.ArgumentParser(description="Password validation")
+        subparsers = parser.add_subparsers(dest="command", required=True)
+
+        bench_parser = subparsers.add_parser("benchmark", help="passwords/s on a generated or given corpus")
+        bench_parser.add_argument("corpus", nargs="?", help="number of passwords to generate, or a file path")
+
+        audit_parser = subparsers.add_parser("audit", help="count a large password file on a process pool")
+        audit_parser.add_argument("path")
+        audit_parser.add_argument("--criteria", default="1,2,3,4", help="comma-separated rule numbers")
+        audit_parser.add_argument("--workers", type=int, default=None)
+        audit_parser.add_argument("--histogram", action="store_true", help="count failures per rule")
+        audit_parser.add_argument("--progress", action="store_true")
+        audit_parser.add_argument("--blocklist", help="Bloom filter file for rule 5 (see blocklist.py build)")
+        audit_parser.add_argument("--exact", help="exact sorted-digest file confirming Bloom filter hits")
+
+        args = parser.parse_args(argv)
+        if args.command == "benchmark":
+            if args.corpus and not args.corpus.isdigit():
+                benchmark(path=args.corpus)
+            else:
+                benchmark(int(args.corpus) if args.corpus else 2_000_000)
+        else:
+            try:
+                criteria = [int(rule) for rule in args.criteria.split(",")]
+            except ValueError:
+                parser.error(f"--criteria must be comma-separated rule numbers, not {args.criteria!r}")
+            unknown = [rule for rule in criteria if rule not in RULES]
+            if unknown:
+                parser.error(f"unknown criteria: {unknown}")
+            blocklist = Blocklist(args.blocklist, args.exact) if args.blocklist else None
+            if blocklist and 5 not in criteria:
+                criteria.append(5)
+            if 5 in criteria and not blocklist:
+                parser.error("rule 5 needs --blocklist")
+            audit(args.path, criteria, args.workers, args.histogram, args.progress, blocklist)
+        return
+
+    # Choose which part to run:
+    choice = input("Enter 1 for input validation or 2 for file validation: ")
+
+    if choice == "1":
+        validate_from_input()
+    elif choice == "2":
+        validate_from_file()
+    else:
+        print("Invalid choice.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,60 +1,208 @@
-import hashlib
 import os
+import sys
 import json
+import time
+import argparse
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+import hashers
+from user_store import UserStore, stress_test
 
-# File to store user data
+# File to store user data (snapshot); changes are appended to USER_DATA_FILE + '.log'
 USER_DATA_FILE = 'user_data.json'
+# Hash algorithm and cost for new hashes, written by the calibrate command
+HASHER_CONFIG_FILE = 'hasher.json'
+DEFAULT_ALGORITHM = 'pbkdf2_sha256'
+
+_store = None
+_hasher = None
+_executor = None
+
+# The user store, loaded from disk once per process
+def get_store():
+    global _store
+    if _store is None:
+        _store = UserStore(USER_DATA_FILE)
+    return _store
 
 # Load user data from file
 def load_user_data():
-    if os.path.exists(USER_DATA_FILE):
-        with open(USER_DATA_FILE, 'r') as file:
-            return json.load(file)
-    return {}
+    return dict(get_store().users)
 
 # Save user data to file
 def save_user_data(user_data):
-    with open(USER_DATA_FILE, 'w') as file:
-        json.dump(user_data, file)
+    get_store().replace_all(user_data)
 
 # Generate a salt
 def generate_salt():
     return os.urandom(16).hex()
 
-# Hash the password with SHA-256 and a salt
+# The hasher used for new passwords: from HASHER_CONFIG_FILE if present, else the default cost
+def get_hasher():
+    global _hasher
+    if _hasher is None:
+        if os.path.exists(HASHER_CONFIG_FILE):
+            with open(HASHER_CONFIG_FILE, 'r') as file:
+                config = json.load(file)
+            _hasher = hashers.HASHERS[config['algorithm']].from_cost(config['cost'])
+        else:
+            _hasher = hashers.HASHERS[DEFAULT_ALGORITHM]()
+    return _hasher
+
+# Hash the password with the configured work-factor KDF and a salt; the result carries an algorithm prefix
 def hash_password(password, salt):
-    return hashlib.sha256((password + salt).encode()).hexdigest()
+    return get_hasher().encode(password, salt)
+
+# Check a login without printing: None if the user does not exist, else True/False.
+# Hashes in an old format or at an old cost are replaced after a successful check.
+# Unknown usernames still pay for one hash, so timing does not reveal which usernames exist.
+def verify_user(username, password):
+    store = get_store()
+    user = store.get(username)
+    if user is None:
+        hash_password(password, generate_salt())
+        return None
+    if not hashers.verify(password, user['salt'], user['hashed_password']):
+        return False
+    if get_hasher().needs_rehash(user['hashed_password']):
+        salt = generate_salt()
+        store.put(username, {**user, 'salt': salt, 'hashed_password': hash_password(password, salt)})
+    return True
+
+# Thread pool for verification; hashlib's KDFs release the GIL, so threads use all cores
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count())
+    return _executor
+
+# Verify a login on the pool; returns a Future of verify_user's result
+def authenticate_user_async(username, password):
+    return get_executor().submit(verify_user, username, password)
+
+# Verify many (username, password) pairs across cores; returns results in order
+def authenticate_users(credentials):
+    return list(get_executor().map(lambda pair: verify_user(*pair), credentials))
 
 # Register a new user
 def register_user(username, password):
-    user_data = load_user_data()
-    if username in user_data:
+    store = get_store()
+    if username in store:
         print("Username already exists.")
         return False
     
     salt = generate_salt()
     hashed_password = hash_password(password, salt)
-    user_data[username] = {'salt': salt, 'hashed_password': hashed_password}
-    save_user_data(user_data)
+    if not store.add(username, {'salt': salt, 'hashed_password': hashed_password}):
+        print("Username already exists.")  # Taken by another process meanwhile
+        return False
     print("User registered successfully.")
     return True
 
 # Authenticate a user
 def authenticate_user(username, password):
-    user_data = load_user_data()
-    if username not in user_data:
+    result = verify_user(username, password)
+    if result is None:
         print("Username not found.")
         return False
     
-    salt = user_data[username]['salt']
-    hashed_password = user_data[username]['hashed_password']
-    if hash_password(password, salt) == hashed_password:
+    if result:
         print("Login successful.")
         return True
     else:
         print("Incorrect password.")
         return False
 
+# Register/login latency with the store already holding `size` users
+# (store cost only: hashing uses a one-iteration PBKDF2)
+def benchmark(sizes=(1_000, 100_000, 1_000_000), operations=1_000):
+    global USER_DATA_FILE, _store, _hasher
+    saved = USER_DATA_FILE, _store, _hasher
+    _hasher = hashers.PBKDF2Hasher(iterations=1)
+    try:
+        for size in sizes:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                USER_DATA_FILE = os.path.join(tmpdir, 'user_data.json')
+                _store = None
+                salt = generate_salt()
+                record = {'salt': salt, 'hashed_password': hash_password('pw', salt)}
+                get_store().replace_all({f'user{i}': record for i in range(size)})
+                _store.close()
+                _store = None
+
+                start = time.perf_counter()
+                get_store()
+                load_seconds = time.perf_counter() - start
+
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    start = time.perf_counter()
+                    for i in range(operations):
+                        register_user(f'new{i}', 'pw')
+                    register_seconds = time.perf_counter() - start
+
+                    start = time.perf_counter()
+                    for i in range(operations):
+                        authenticate_user(f'user{i * size // operations}', 'pw')
+                    login_seconds = time.perf_counter() - start
+                _store.close()
+
+                print(f"{size:>9,} users: load {load_seconds * 1e3:8.1f} ms, "
+                      f"register {register_seconds / operations * 1e6:8.1f} us, "
+                      f"login {login_seconds / operations * 1e6:8.1f} us")
+    finally:
+        USER_DATA_FILE, _store, _hasher = saved
+
+# Pick the cost whose hash takes about target_ms here and save it for new hashes
+def calibrate(algorithm=DEFAULT_ALGORITHM, target_ms=250):
+    global _hasher
+    cost = hashers.calibrate(algorithm, target_ms / 1000)
+    with open(HASHER_CONFIG_FILE, 'w') as file:
+        json.dump({'algorithm': algorithm, 'cost': cost}, file)
+    _hasher = None
+    print(f"{algorithm} cost {cost} (at most {target_ms} ms per hash) saved to {HASHER_CONFIG_FILE}.")
+
+# Logins/s at several cost levels, one at a time and through the verification pool
+def benchmark_hashing(algorithm=DEFAULT_ALGORITHM, costs=None, logins=64):
+    global USER_DATA_FILE, _store, _hasher
+    if costs is None:
+        costs = (2**12, 2**13, 2**14, 2**15) if algorithm == 'scrypt' else (10_000, 100_000, 600_000)
+    saved = USER_DATA_FILE, _store, _hasher
+    try:
+        for cost in costs:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                USER_DATA_FILE = os.path.join(tmpdir, 'user_data.json')
+                _store = None
+                _hasher = hashers.HASHERS[algorithm].from_cost(cost)
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    for i in range(logins):
+                        register_user(f'user{i}', 'pw')
+                credentials = [(f'user{i}', 'pw') for i in range(logins)]
+
+                start = time.perf_counter()
+                for username, password in credentials:
+                    verify_user(username, password)
+                sequential = logins / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                authenticate_users(credentials)
+                pooled = logins / (time.perf_counter() - start)
+                _store.close()
+                print(f"{algorithm} cost {cost:>9,}: {sequential:8.1f} logins/s sequential, "
+                      f"{pooled:8.1f} logins/s on {os.cpu_count()} threads")
+    finally:
+        USER_DATA_FILE, _store, _hasher = saved
+
+# Many processes registering into one store at once: check nothing is lost and report commits/s
+def stress(processes=8, threads=4, users=250):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        expected, found, commits, seconds = stress_test(os.path.join(tmpdir, 'user_data.json'),
+                                                        processes, threads, users)
+    print(f"{processes} processes x {threads} threads: {found}/{expected} registrations kept")
+    print(f"{expected / seconds:,.0f} registrations/s, {commits / seconds:,.0f} commits/s, "
+          f"{expected / max(commits, 1):.1f} registrations per fsync")
+    return found == expected
+
 # Main function to demonstrate the system
 def main():
     while True:
@@ -78,5 +226,33 @@ def main():
         else:
             print("Invalid choice. Please try again.")
 
+# Command-line tools; with no arguments the interactive menu runs
+def cli(argv):
+    parser = argparse.ArgumentParser(description="User store tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("benchmark", help="register/login latency at 1K, 100K and 1M users")
+    subparsers.add_parser("stress", help="concurrent writers must not lose registrations")
+    calibrate_parser = subparsers.add_parser("calibrate", help="choose the hash cost for a target latency")
+    calibrate_parser.add_argument("--algorithm", default=DEFAULT_ALGORITHM, choices=["pbkdf2_sha256", "scrypt"])
+    calibrate_parser.add_argument("--target-ms", type=float, default=250)
+    hashing_parser = subparsers.add_parser("benchmark-hashing", help="logins/s per cost level")
+    hashing_parser.add_argument("--algorithm", default=DEFAULT_ALGORITHM, choices=["pbkdf2_sha256", "scrypt"])
+    hashing_parser.add_argument("--costs", help="comma-separated cost levels")
+
+    args = parser.parse_args(argv)
+    if args.command == "benchmark":
+        benchmark()
+    elif args.command == "stress":
+        return 0 if stress() else 1
+    elif args.command == "calibrate":
+        calibrate(args.algorithm, args.target_ms)
+    else:
+        costs = [int(cost) for cost in args.costs.split(",")] if args.costs else None
+        benchmark_hashing(args.algorithm, costs)
+    return 0
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if sys.argv[1:]:
+        sys.exit(cli(sys.argv[1:]))
+    else:
+        main()
\ No newline at end of file
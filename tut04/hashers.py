@@ -0,0 +1,117 @@
+import hmac
+import time
+import hashlib
+
+# Stored hashes look like "<algorithm>$<cost fields...>$<hex digest>"; a bare
+# 64-character hex digest is the original salted SHA-256 format.
+SEPARATOR = "$"
+
+
+class SHA256Hasher:
+    """The original format: one SHA-256 of password + salt. Verify-only; always needs a rehash."""
+
+    algorithm = "sha256"
+
+    def encode(self, password, salt):
+        return hashlib.sha256((password + salt).encode()).hexdigest()
+
+    def verify(self, password, salt, encoded):
+        return hmac.compare_digest(self.encode(password, salt), encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+
+class PBKDF2Hasher:
+    """PBKDF2-HMAC-SHA256; the cost is the iteration count."""
+
+    algorithm = "pbkdf2_sha256"
+
+    def __init__(self, iterations=600_000):
+        self.iterations = iterations
+
+    def encode(self, password, salt):
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), self.iterations)
+        return SEPARATOR.join((self.algorithm, str(self.iterations), digest.hex()))
+
+    def verify(self, password, salt, encoded):
+        _, iterations, digest = encoded.split(SEPARATOR)
+        actual = hashlib.pbkdf2_hmac("sha256", password.encode(), salt.encode(), int(iterations))
+        return hmac.compare_digest(actual.hex(), digest)
+
+    def needs_rehash(self, encoded):
+        return not encoded.startswith(f"{self.algorithm}{SEPARATOR}{self.iterations}{SEPARATOR}")
+
+    @classmethod
+    def from_cost(cls, cost):
+        return cls(iterations=cost)
+
+    @property
+    def cost(self):
+        return self.iterations
+
+
+class ScryptHasher:
+    """scrypt; the cost is the CPU/memory parameter n (a power of two), with r=8 and p=1."""
+
+    algorithm = "scrypt"
+
+    def __init__(self, n=2**14, r=8, p=1):
+        self.n, self.r, self.p = n, r, p
+
+    def _digest(self, password, salt, n, r, p):
+        return hashlib.scrypt(password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                              maxmem=2 * 128 * r * n + 2**20).hex()
+
+    def encode(self, password, salt):
+        digest = self._digest(password, salt, self.n, self.r, self.p)
+        return SEPARATOR.join((self.algorithm, str(self.n), str(self.r), str(self.p), digest))
+
+    def verify(self, password, salt, encoded):
+        _, n, r, p, digest = encoded.split(SEPARATOR)
+        return hmac.compare_digest(self._digest(password, salt, int(n), int(r), int(p)), digest)
+
+    def needs_rehash(self, encoded):
+        return not encoded.startswith(SEPARATOR.join((self.algorithm, str(self.n), str(self.r), str(self.p), "")))
+
+    @classmethod
+    def from_cost(cls, cost):
+        return cls(n=cost)
+
+    @property
+    def cost(self):
+        return self.n
+
+
+# Algorithm prefix -> hasher class; new hashers only need an entry here
+HASHERS = {cls.algorithm: cls for cls in (SHA256Hasher, PBKDF2Hasher, ScryptHasher)}
+
+
+def identify(encoded):
+    """Hasher class that produced a stored hash."""
+    if SEPARATOR not in encoded:
+        return SHA256Hasher
+    algorithm = encoded.split(SEPARATOR, 1)[0]
+    if algorithm not in HASHERS:
+        raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+    return HASHERS[algorithm]
+
+
+def verify(password, salt, encoded):
+    """Check a password against a stored hash of any supported format."""
+    return identify(encoded)().verify(password, salt, encoded)
+
+
+def calibrate(algorithm="pbkdf2_sha256", target_seconds=0.25, start=None):
+    """Largest cost (doubling from a small start) whose hash takes at most target_seconds here."""
+    hasher_class = HASHERS[algorithm]
+    cost = start or (1024 if algorithm == "scrypt" else 10_000)
+    best = cost
+    while True:
+        hasher = hasher_class.from_cost(cost)
+        begin = time.perf_counter()
+        hasher.encode("calibration password", "calibration salt")
+        if time.perf_counter() - begin > target_seconds:
+            return best
+        best = cost
+        cost *= 2
@@ -0,0 +1,325 @@
+import os
+import json
+import time
+import threading
+import contextlib
+import multiprocessing
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+COMPACT_MIN_ENTRIES = 1000  # Never compact a log shorter than this
+# Windows cannot replace a file another handle has open, so there the log is
+# opened per read, under the file lock, and never held open between calls
+KEEP_LOG_OPEN = fcntl is not None
+
+
+if fcntl is not None:
+    def lock_file(f, exclusive):
+        fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+    def unlock_file(f):
+        fcntl.flock(f, fcntl.LOCK_UN)
+else:
+    def lock_file(f, exclusive):
+        # msvcrt has no shared locks, so readers take the exclusive lock as well
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                pass  # LK_LOCK gives up after about 10 s; keep waiting, as flock does
+
+    def unlock_file(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class _Write:
+    """A change waiting for the next group commit."""
+
+    def __init__(self, username, record, only_new):
+        self.username = username
+        self.record = record
+        self.only_new = only_new
+        self.applied = False
+        self.error = None
+        self.done = threading.Event()
+
+
+class UserStore:
+    """Users loaded into memory once, indexed by username.
+
+    The JSON file (the original user_data.json format) is the snapshot.
+    Changes are appended as JSON lines to a log next to it, so registering a
+    user writes one line instead of the whole file. When the log grows past
+    the size of the snapshot (and COMPACT_MIN_ENTRIES), it is folded into a
+    new snapshot written atomically, and the log is replaced by an empty one.
+    An existing user_data.json therefore needs no migration: it is read as
+    the first snapshot.
+
+    Several processes can share the files. Writes take an exclusive flock on
+    a lock file next to the snapshot, first read whatever other processes
+    appended, then append and fsync before returning. Writes from threads of
+    one process are group-committed: while one thread holds the lock and
+    fsyncs, the others queue up and the next of them writes the whole queue
+    with a single fsync. Readers pick up appended lines without the file lock
+    and reload under a shared lock when another process has compacted.
+
+    Locking uses flock on POSIX and falls back to msvcrt.locking on Windows,
+    where there is no shared mode, so reloads exclude each other there too.
+    Windows also refuses to replace an open file, so there readers open the
+    log only while holding the lock, and compaction (which holds it
+    exclusively) never meets an open handle.
+    """
+
+    def __init__(self, path, compact_min_entries=COMPACT_MIN_ENTRIES):
+        self.path = path
+        self.log_path = path + ".log"
+        self.compact_min_entries = compact_min_entries
+        self.commits = 0  # fsync'd batches written by this process
+        self._lock_file = open(path + ".lock", "a")
+        # flock does not exclude threads sharing the descriptor, so in-process
+        # state and the file lock are always taken under this lock first
+        self._state = threading.RLock()
+        self._mutex = threading.Lock()  # Guards the group-commit queue
+        self._pending = []
+        self._committing = False
+        self._reader = None
+        with self._file_lock(exclusive=False):
+            self._reload()
+
+    @contextlib.contextmanager
+    def _file_lock(self, exclusive=True):
+        with self._state:
+            lock_file(self._lock_file, exclusive)
+            try:
+                yield
+            finally:
+                unlock_file(self._lock_file)
+
+    def _reload(self):
+        """Read the snapshot and the whole log; the caller holds the file lock."""
+        users = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                users = json.load(f)
+        if not os.path.exists(self.log_path):
+            open(self.log_path, "a").close()
+        self._open_log()
+        self.users = users
+        self.snapshot_size = len(users)
+        self._read_log()
+
+    def _open_log(self):
+        self._close_log()
+        reader = open(self.log_path, "rb")
+        self._log_inode = os.fstat(reader.fileno()).st_ino
+        if KEEP_LOG_OPEN:
+            self._reader = reader
+        else:
+            reader.close()
+        self._log_offset = 0
+        self.log_entries = 0
+
+    def _close_log(self):
+        if self._reader:
+            self._reader.close()
+            self._reader = None
+
+    def _read_log(self):
+        """Apply complete lines appended since the last read; a partial tail is left for later."""
+        reader = self._reader or open(self.log_path, "rb")
+        try:
+            reader.seek(self._log_offset)
+            for line in reader:
+                try:
+                    entry = json.loads(line) if line.endswith(b"\n") else None
+                except ValueError:
+                    entry = None
+                if entry is None:
+                    break  # Being written right now, or torn by a crash
+                self.users[entry["user"]] = entry["record"]
+                self.log_entries += 1
+                self._log_offset += len(line)
+        finally:
+            if reader is not self._reader:
+                reader.close()
+
+    def refresh(self):
+        """Catch up with changes made by other processes."""
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and stat.st_ino == self._log_inode and stat.st_size <= self._log_offset:
+            return  # Nothing new; the common case costs one stat
+        with self._state:
+            if stat is None or stat.st_ino != self._log_inode or not KEEP_LOG_OPEN:
+                with self._file_lock(exclusive=False):
+                    if os.path.exists(self.log_path) and os.stat(self.log_path).st_ino == self._log_inode:
+                        self._read_log()
+                    else:
+                        self._reload()
+            else:
+                self._read_log()
+
+    def __contains__(self, username):
+        self.refresh()
+        return username in self.users
+
+    def __len__(self):
+        self.refresh()
+        return len(self.users)
+
+    def get(self, username):
+        self.refresh()
+        return self.users.get(username)
+
+    def add(self, username, record):
+        """Store a new user; returns False if the username is taken (by any process)."""
+        return self._commit(_Write(username, record, only_new=True))
+
+    def put(self, username, record):
+        """Create or replace a user's record."""
+        self._commit(_Write(username, record, only_new=False))
+
+    def _commit(self, write):
+        with self._mutex:
+            self._pending.append(write)
+            leader = not self._committing
+            self._committing = True
+        if leader:
+            # Keep writing whatever queued up during the previous fsync
+            while True:
+                with self._mutex:
+                    batch, self._pending = self._pending, []
+                    if not batch:
+                        self._committing = False
+                        break
+                self._write_batch(batch)
+        write.done.wait()
+        if write.error:
+            raise write.error
+        return write.applied
+
+    def _write_batch(self, batch):
+        try:
+            with self._file_lock():
+                self._catch_up_locked()
+                lines = []
+                for write in batch:
+                    if write.only_new and write.username in self.users:
+                        continue
+                    lines.append(json.dumps({"user": write.username, "record": write.record}) + "\n")
+                    write.applied = True
+                    self.users[write.username] = write.record
+                data = "".join(lines).encode("utf-8")
+                if data:
+                    with open(self.log_path, "ab") as log:
+                        log.write(data)
+                        log.flush()
+                        os.fsync(log.fileno())
+                    self.commits += 1
+                self._log_offset += len(data)
+                self.log_entries += len(lines)
+                if self.log_entries > max(self.compact_min_entries, self.snapshot_size):
+                    self._compact_locked()
+        except Exception as e:
+            for write in batch:
+                write.error = e
+        finally:
+            for write in batch:
+                write.done.set()
+
+    def _catch_up_locked(self):
+        """Catch up while holding the exclusive lock, dropping a log tail torn by a crash."""
+        if os.stat(self.log_path).st_ino != self._log_inode:
+            self._reload()
+        else:
+            self._read_log()
+        if os.path.getsize(self.log_path) > self._log_offset:
+            os.truncate(self.log_path, self._log_offset)
+
+    def replace_all(self, users):
+        """Swap in a whole user dict, e.g. when importing another file."""
+        with self._file_lock():
+            self.users = dict(users)
+            self._compact_locked()
+
+    def compact(self):
+        """Write the users to a new snapshot atomically and start an empty log."""
+        with self._file_lock():
+            self._catch_up_locked()
+            self._compact_locked()
+
+    def _compact_locked(self):
+        self._close_log()  # Windows cannot replace the log while it is open
+        write_atomically(self.path, json.dumps(self.users).encode("utf-8"))
+        # A new log file (new inode) tells other processes to reload the snapshot
+        write_atomically(self.log_path, b"")
+        self._open_log()
+        self.snapshot_size = len(self.users)
+
+    def close(self):
+        self._close_log()
+        self._lock_file.close()
+
+
+def write_atomically(path, data):
+    """Replace a file with temp file + fsync + rename, so a crash leaves the old or the new version."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    if os.name == "nt":
+        return  # Windows cannot open a directory to fsync it
+    directory = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(directory)
+    finally:
+        os.close(directory)
+
+
+def _stress_worker(path, worker, threads, users, results):
+    store = UserStore(path)
+
+    def register(thread):
+        for i in range(users):
+            store.add(f"w{worker}-t{thread}-u{i}", {"worker": worker})
+
+    pool = [threading.Thread(target=register, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put(store.commits)
+    store.close()
+
+
+def stress_test(path, processes=8, threads=4, users=250):
+    """Register users from many processes and threads at once and count how many survive.
+
+    Returns (registrations made, registrations found afterwards, fsync'd commits, seconds).
+    """
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_stress_worker, args=(path, w, threads, users, results))
+               for w in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    commits = sum(results.get() for _ in workers)
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start
+
+    store = UserStore(path)
+    found = sum(1 for name in store.users if name.startswith("w"))
+    store.close()
+    return processes * threads * users, found, commits, seconds
@@ -1,14 +1,49 @@
-from flask import Flask, render_template, request, redirect, url_for, flash
+import io
+import csv
+from flask import Flask, Response, render_template, stream_template, request, redirect, url_for, flash, jsonify
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
 from db_config import init_db
 from models import User
+from user_cache import UserCache
+from student_import import bulk_update_students, read_rows
+from metrics import Metrics, gauge
+from page_cache import PageCache
 
 app = Flask(__name__)
 app.secret_key = 'supersecretkey'  # Change this for security
-
-
-mysql = init_db(app)
+app.config.setdefault('USER_CACHE_SIZE', 1024)
+app.config.setdefault('USER_CACHE_TTL', 300)  # Seconds a cached user (and its role) may be served
+app.config.setdefault('PAGE_SIZE', 50)  # Students per page of view_data
+app.config.setdefault('MAX_PAGE_SIZE', 500)
+app.config.setdefault('IMPORT_BATCH_SIZE', 1000)  # Rows per transaction in import_data
+app.config.setdefault('SLOW_REQUEST_THRESHOLD', 0.5)  # Seconds; slower requests are logged (None to disable)
+app.config.setdefault('PAGE_CACHE_SIZE', 256)  # Rendered pages kept by page_cache
+app.config.setdefault('PAGE_CACHE_TTL', 60)  # Seconds before a page is rebuilt even with no bump seen
+
+
+db = init_db(app)
+user_cache = UserCache(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+# Rendered pages with ETag/Last-Modified; views that write a table must call page_cache.bump(table)
+page_cache = PageCache(app.config['PAGE_CACHE_SIZE'], app.config['PAGE_CACHE_TTL'])
+
+# Request, query and password-check timings, served on /metrics
+metrics = Metrics()
+metrics.init_app(app)
+db.query_hook = metrics.observe_query
+
+def pool_and_cache_gauges():
+    pool, cache, pages = db.pool.stats(), user_cache.stats(), page_cache.stats()
+    return (gauge('db_pool_connections', 'Connections opened by the pool.', pool['created'])
+            + gauge('db_pool_in_use', 'Connections currently borrowed.', pool['in_use'])
+            + gauge('db_pool_waits', 'Acquires that had to wait for a free connection.', pool['waits'])
+            + gauge('user_cache_hits', 'load_user calls served from the cache.', cache['hits'])
+            + gauge('user_cache_misses', 'load_user calls that queried the users table.', cache['misses'])
+            + gauge('page_cache_hits', 'Pages served from the page cache.', pages['hits'])
+            + gauge('page_cache_not_modified', 'Conditional requests answered with 304.', pages['not_modified'])
+            + gauge('page_cache_misses', 'Pages rendered because no cached copy existed.', pages['misses']))
+
+metrics.collectors.append(pool_and_cache_gauges)
 
 # Flask-Login
 login_manager = LoginManager()
@@ -17,10 +52,10 @@ login_manager.init_app(app)
 
 @login_manager.user_loader
 def load_user(user_id):
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-    data = cur.fetchone()
-    cur.close()
+    return user_cache.get(user_id, fetch_user)
+
+def fetch_user(user_id):
+    data = db.query_one("SELECT * FROM users WHERE id = %s", (user_id,))
 
     if data:
         return User(id=data['id'], username=data['username'], password_hash=data['password_hash'], role=data['role'])
@@ -37,10 +72,8 @@ def register():
         password = generate_password_hash(request.form['password'])
         role = 'viewer'  # Default role
 
-        cur = mysql.connection.cursor()
-        cur.execute("INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)", (username, password, role))
-        mysql.connection.commit()
-        cur.close()
+        db.execute("INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)", (username, password, role))
+        page_cache.bump('users')
 
         flash("Registered successfully! Please log in.", "success")
         return redirect(url_for('login'))
@@ -53,14 +86,12 @@ def login():
         username = request.form['username']
         password = request.form['password']
 
-        cur = mysql.connection.cursor()
-        cur.execute("SELECT * FROM users WHERE username = %s", (username,))
-        data = cur.fetchone()
-        cur.close()
+        data = db.query_one("SELECT * FROM users WHERE username = %s", (username,))
 
-        if data and check_password_hash(data['password_hash'], password):
+        if data and metrics.time_password_check(check_password_hash, data['password_hash'], password):
             user = User(id=data['id'], username=data['username'], password_hash=data['password_hash'], role=data['role'])
             login_user(user)
+            user_cache.put(user)
             flash("Login successful!", "success")
             return redirect(url_for('dashboard'))
         else:
@@ -70,11 +101,13 @@ def login():
 
 @app.route('/dashboard')
 @login_required
+@page_cache.cached(per_user=True)
 def dashboard():
     return render_template('dashboard.html', role=current_user.role)
 
 @app.route('/assign_role', methods=['GET', 'POST'])
 @login_required
+@page_cache.cached('users', shows_flashes=True)
 def assign_role():
     if current_user.role != 'admin':
         flash("Access denied!", "danger")
@@ -84,27 +117,52 @@ def assign_role():
         username = request.form['username']
         role = request.form['role']
 
-        cur = mysql.connection.cursor()
-        cur.execute("UPDATE users SET role = %s WHERE username = %s", (role, username))
-        mysql.connection.commit()
-        cur.close()
+        with db.transaction() as cur:
+            # Usernames compare case-insensitively in MySQL, so ask the database which rows match
+            cur.execute("SELECT id FROM users WHERE username = %s", (username,))
+            user_ids = [row['id'] for row in cur.fetchall()]
+            cur.execute("UPDATE users SET role = %s WHERE username = %s", (role, username))
+        for user_id in user_ids:
+            user_cache.invalidate(user_id)  # The new role applies from the user's next request
+        page_cache.bump('users')
         flash("Role updated successfully!", "success")
         return redirect(url_for('dashboard'))
 
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT username, role FROM users")
-    users = cur.fetchall()
-    cur.close()
+    users = db.query("SELECT username, role FROM users")
     return render_template('assign_role.html', users=users)
 
+STUDENT_COLUMNS = "roll, name, age, branch, hometown"
+
+# One page of students by keyset on the roll primary key: rows after `after`, or the page before `before`.
+# Returns (rows, roll for the previous-page link or None, roll for the next-page link or None).
+def fetch_students_page(page_size, after=None, before=None):
+    if before is not None:
+        rows = db.query(f"SELECT {STUDENT_COLUMNS} FROM stud_info WHERE roll < %s ORDER BY roll DESC LIMIT %s",
+                        (before, page_size + 1))
+        if len(rows) <= page_size:
+            return fetch_students_page(page_size)  # Reached the start
+        rows = rows[:page_size][::-1]
+        return rows, rows[0]['roll'], rows[-1]['roll']
+    if after is not None:
+        rows = db.query(f"SELECT {STUDENT_COLUMNS} FROM stud_info WHERE roll > %s ORDER BY roll LIMIT %s",
+                        (after, page_size + 1))
+    else:
+        rows = db.query(f"SELECT {STUDENT_COLUMNS} FROM stud_info ORDER BY roll LIMIT %s", (page_size + 1,))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return rows, (rows[0]['roll'] if after is not None and rows else None), (rows[-1]['roll'] if has_more else None)
+
 @app.route('/view_data')
 @login_required
+@page_cache.cached('stud_info')
 def view_data():
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM stud_info")
-    students = cur.fetchall()
-    cur.close()
-    return render_template('view_data.html', students=students)
+    page_size = min(max(request.args.get('page_size', app.config['PAGE_SIZE'], type=int), 1),
+                    app.config['MAX_PAGE_SIZE'])
+    students, prev_roll, next_roll = fetch_students_page(page_size, request.args.get('after', type=int),
+                                                         request.args.get('before', type=int))
+    # Streamed, so the first bytes go out before the table is rendered
+    return app.response_class(stream_template('view_data.html', students=students, page_size=page_size,
+                                              prev_roll=prev_roll, next_roll=next_roll))
 
 @app.route('/edit_data', methods=['GET', 'POST'])
 @login_required
@@ -120,19 +178,54 @@ def edit_data():
         branch = request.form['branch']
         hometown = request.form['hometown']
 
-        cur = mysql.connection.cursor()
-        cur.execute("UPDATE stud_info SET name=%s, age=%s, branch=%s, hometown=%s WHERE roll=%s",
-                    (name, age, branch, hometown, roll))
-        mysql.connection.commit()
-        cur.close()
+        db.execute("UPDATE stud_info SET name=%s, age=%s, branch=%s, hometown=%s WHERE roll=%s",
+                   (name, age, branch, hometown, roll))
+        page_cache.bump('stud_info')
         flash("Record updated successfully!", "success")
         return redirect(url_for('view_data'))
 
-    cur = mysql.connection.cursor()
-    cur.execute("SELECT * FROM stud_info")
-    students = cur.fetchall()
-    cur.close()
-    return render_template('edit_data.html', students=students)
+    # The form edits by roll number and lists no students, so there is nothing to query.
+    # Not streamed: the template pops flashed messages, which must be saved with the session.
+    return render_template('edit_data.html')
+
+# Bulk update: a CSV/JSON file upload from the form, or a JSON array of students posted by a script
+@app.route('/import_data', methods=['GET', 'POST'])
+@login_required
+def import_data():
+    if current_user.role not in ['admin', 'editor']:
+        flash("You do not have permission to edit data!", "danger")
+        return redirect(url_for('dashboard'))
+
+    if request.method == 'POST':
+        batch_size = max(request.values.get('batch_size', app.config['IMPORT_BATCH_SIZE'], type=int), 1)
+        try:
+            if request.is_json:
+                students = request.get_json()
+                if not isinstance(students, list):
+                    raise ValueError("expected a JSON array of students")
+                rows = ((number, row if isinstance(row, dict) else {}) for number, row in enumerate(students, 1))
+            else:
+                upload = request.files['file']
+                rows = read_rows(io.TextIOWrapper(upload.stream, encoding='utf-8', newline=''), upload.filename)
+            try:
+                report = bulk_update_students(db, rows, batch_size)
+            finally:
+                page_cache.bump('stud_info')  # Earlier batches are committed even if a later one fails
+        except (ValueError, UnicodeDecodeError, csv.Error) as e:
+            if request.is_json:
+                return jsonify({"error": str(e)}), 400
+            flash(f"Import failed: {e}", "danger")
+            return redirect(url_for('import_data'))
+
+        if request.is_json:
+            return jsonify(report)
+        return render_template('import_data.html', report=report)
+
+    return render_template('import_data.html', report=None)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.expose(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/logout')
 @login_required
@@ -0,0 +1,387 @@
+import os
+import re
+import time
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """At most max_size connections, created on demand and reused.
+
+    acquire() blocks for up to timeout seconds when every connection is in
+    use. Acquire times and how often callers had to wait (saturation) are
+    recorded for stats(). If check is given, a connection that sat idle for
+    more than check_after seconds is passed to check(connection) before it
+    is handed out; one that fails (e.g. closed by the server's wait_timeout)
+    is replaced with a new connection instead of failing the caller.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=5.0, check=None, check_after=30.0):
+        self._connect = connect
+        self._check = check
+        self.check_after = check_after
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # (connection, idle since); most recently used first
+        self._lock = threading.Lock()
+        self.created = 0
+        self.in_use = 0
+        self.acquires = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.replaced = 0
+        self.acquire_seconds = 0.0
+        self.max_acquire_seconds = 0.0
+
+    def acquire(self):
+        start = time.perf_counter()
+        while True:
+            try:
+                connection, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    create = self.created < self.max_size
+                    if create:
+                        self.created += 1
+                if create:
+                    try:
+                        connection = self._connect()
+                    except Exception:
+                        with self._lock:
+                            self.created -= 1
+                        raise
+                    break
+                with self._lock:
+                    self.waits += 1
+                try:
+                    connection, idle_since = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout} s") from None
+            if self._usable(connection, idle_since):
+                break
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self.in_use += 1
+            self.acquires += 1
+            self.acquire_seconds += seconds
+            self.max_acquire_seconds = max(self.max_acquire_seconds, seconds)
+        return connection
+
+    def _usable(self, connection, idle_since):
+        """Check a long-idle connection; a dead one is closed and forgotten so acquire() opens another."""
+        if self._check is None or time.monotonic() - idle_since <= self.check_after:
+            return True
+        try:
+            self._check(connection)
+            return True
+        except Exception:
+            with self._lock:
+                self.created -= 1
+                self.replaced += 1
+            try:
+                connection.close()
+            except Exception:
+                pass
+            return False
+
+    def release(self, connection):
+        with self._lock:
+            self.in_use -= 1
+        self._idle.put((connection, time.monotonic()))
+
+    def discard(self, connection):
+        """Drop a broken connection instead of returning it."""
+        with self._lock:
+            self.in_use -= 1
+            self.created -= 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_size": self.max_size,
+                "created": self.created,
+                "in_use": self.in_use,
+                "acquires": self.acquires,
+                "waits": self.waits,
+                "timeouts": self.timeouts,
+                "replaced": self.replaced,
+                "mean_acquire_us": self.acquire_seconds / self.acquires * 1e6 if self.acquires else 0.0,
+                "max_acquire_us": self.max_acquire_seconds * 1e6,
+            }
+
+
+class MySQLBackend:
+    """MySQL/MariaDB through MySQLdb (the driver behind flask_mysqldb), rows as dicts.
+
+    Connections run in autocommit mode, so a plain SELECT never leaves a
+    transaction (and its InnoDB read snapshot) open on a pooled connection;
+    Database.transaction() starts one explicitly.
+    """
+
+    def __init__(self, host, user, password, database, port=3306):
+        self.params = dict(host=host, user=user, passwd=password, db=database, port=port)
+
+    def connect(self):
+        import MySQLdb
+        import MySQLdb.cursors
+        return MySQLdb.connect(cursorclass=MySQLdb.cursors.DictCursor, charset="utf8mb4", autocommit=True,
+                               **self.params)
+
+    def begin(self, connection):
+        connection.begin()
+
+    def check(self, connection):
+        connection.ping()
+
+    def in_transaction(self, connection):
+        return False  # Autocommit: transaction() commits or rolls back its own BEGIN
+
+    def translate(self, sql):
+        return sql
+
+
+class SQLiteBackend:
+    """SQLite file database, created from the MySQL dump on first use.
+
+    Queries keep MySQL's %s placeholders; translate() rewrites them to ?.
+    """
+
+    def __init__(self, path, schema_path=None):
+        self.path = path
+        self.schema_path = schema_path
+        self._schema_lock = threading.Lock()
+
+    def connect(self):
+        with self._schema_lock:
+            connection = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            connection.row_factory = dict_row
+            connection.execute("PRAGMA journal_mode=WAL")
+            if self.schema_path and not connection.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table'").fetchone():
+                with open(self.schema_path, "r", encoding="utf-8") as f:
+                    connection.executescript(mysql_dump_to_sqlite(f.read()))
+        return connection
+
+    def begin(self, connection):
+        pass  # sqlite3 opens a transaction implicitly before the first write
+
+    def check(self, connection):
+        pass  # A local file never times out
+
+    def in_transaction(self, connection):
+        return connection.in_transaction
+
+    def translate(self, sql):
+        return translate_placeholders(sql)
+
+
+def dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+@lru_cache(maxsize=256)
+def translate_placeholders(sql):
+    return sql.replace("%s", "?")
+
+
+def mysql_dump_to_sqlite(dump):
+    """Rewrite a phpMyAdmin dump (like role_based_access.sql) as an SQLite script.
+
+    Primary keys declared by the dump's ALTER TABLE statements are moved into
+    the column definitions (an integer key becomes SQLite's auto-incrementing
+    rowid alias), unique keys become indexes, and MySQL-only statements and
+    table options are dropped.
+    """
+    dump = re.sub(r"/\*!.*?\*/;?", "", dump, flags=re.DOTALL)
+    dump = "\n".join(line for line in dump.splitlines() if not line.lstrip().startswith("--"))
+    statements = [statement.strip() for statement in dump.split(";\n") if statement.strip()]
+
+    primary_keys, indexes = {}, []
+    for statement in statements:
+        match = re.match(r"ALTER TABLE `(\w+)`(.*)", statement, re.DOTALL)
+        if not match:
+            continue
+        table, clauses = match.groups()
+        for column in re.findall(r"ADD PRIMARY KEY \(`(\w+)`\)", clauses):
+            primary_keys[table] = column
+        for name, columns in re.findall(r"ADD UNIQUE KEY `(\w+)` \(([^)]*)\)", clauses):
+            indexes.append(f"CREATE UNIQUE INDEX `{table}_{name}` ON `{table}` ({columns});")
+
+    script = []
+    for statement in statements:
+        if statement.startswith("CREATE TABLE"):
+            table = re.match(r"CREATE TABLE `(\w+)`", statement).group(1)
+            statement = re.sub(r"\)\s*ENGINE=.*$", ")", statement, flags=re.DOTALL)
+            statement = re.sub(r"\benum\([^)]*\)", "TEXT", statement)
+            statement = re.sub(r"\bint\(\d+\)", "INTEGER", statement)
+            if table in primary_keys:
+                statement = re.sub(rf"(`{primary_keys[table]}` INTEGER) NOT NULL", r"\1 PRIMARY KEY", statement)
+            script.append(statement + ";")
+        elif statement.startswith("INSERT INTO"):
+            script.append(statement.replace("\\'", "''") + ";")
+    return "\n".join(script + indexes)
+
+
+class Database:
+    """Pooled database access with parameterised helpers.
+
+    SQL uses %s placeholders on every backend. Each helper borrows a
+    connection only for the statement (or the `transaction()` block), so
+    connections are never held while a template renders. queries counts
+    statements executed, i.e. database round trips. If query_hook is set, it
+    is called as query_hook(sql, seconds, rows) for every statement, timed
+    from execute until its rows are fetched.
+    """
+
+    def __init__(self, backend, pool_size=10, timeout=5.0):
+        self.backend = backend
+        self.pool = ConnectionPool(backend.connect, pool_size, timeout, check=backend.check)
+        self.queries = 0
+        self.query_hook = None
+
+    @contextmanager
+    def connection(self):
+        connection = self.pool.acquire()
+        try:
+            yield connection
+        except BaseException:
+            self._release(connection, rollback=True)
+            raise
+        # A finished block normally leaves no transaction open; roll back only if one is
+        self._release(connection, rollback=self.backend.in_transaction(connection))
+
+    def _release(self, connection, rollback):
+        """Return a connection to the pool, rolled back first if asked; one that cannot roll back is discarded."""
+        if rollback:
+            try:
+                connection.rollback()
+            except Exception:
+                self.pool.discard(connection)
+                return
+        self.pool.release(connection)
+
+    @contextmanager
+    def cursor(self):
+        """A cursor whose connection goes back to the pool when the block ends; commits nothing."""
+        with self.connection() as connection:
+            cur = connection.cursor()
+            try:
+                yield _Cursor(self, cur)
+            finally:
+                cur.close()
+
+    @contextmanager
+    def transaction(self):
+        """A cursor whose statements commit together when the block succeeds and roll back otherwise."""
+        with self.connection() as connection:
+            self.backend.begin(connection)
+            cur = connection.cursor()
+            try:
+                yield _Cursor(self, cur)
+                connection.commit()
+            finally:
+                cur.close()
+
+    def query(self, sql, params=()):
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchall()
+
+    def query_one(self, sql, params=()):
+        with self.cursor() as cur:
+            cur.execute(sql, params)
+            return cur.fetchone()
+
+    def execute(self, sql, params=()):
+        """Run one write statement in its own transaction; returns the affected row count."""
+        with self.transaction() as cur:
+            cur.execute(sql, params)
+            return cur.rowcount
+
+    def executemany(self, sql, rows):
+        with self.transaction() as cur:
+            cur.executemany(sql, rows)
+            return cur.rowcount
+
+
+class _Cursor:
+    """Wraps a driver cursor so SQL is translated for the backend and round trips are counted."""
+
+    def __init__(self, database, cursor):
+        self._database = database
+        self._cursor = cursor
+        self._pending = None  # (sql, start) of a SELECT whose rows are not fetched yet
+
+    def execute(self, sql, params=()):
+        self._database.queries += 1
+        start = time.perf_counter()
+        self._cursor.execute(self._database.backend.translate(sql), params)
+        self._timed(sql, start)
+        return self
+
+    def executemany(self, sql, rows):
+        self._database.queries += 1
+        start = time.perf_counter()
+        self._cursor.executemany(self._database.backend.translate(sql), rows)
+        self._timed(sql, start)
+        return self
+
+    def _timed(self, sql, start):
+        if self._database.query_hook is None:
+            return
+        if self._cursor.description is None:
+            self._database.query_hook(sql, time.perf_counter() - start, max(self._cursor.rowcount, 0))
+        else:
+            self._pending = (sql, start)
+
+    def _fetched(self, rows):
+        if self._pending is not None:
+            sql, start = self._pending
+            now = time.perf_counter()
+            self._database.query_hook(sql, now - start, rows)
+            self._pending = (sql, now)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        self._fetched(0 if row is None else 1)
+        return row
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows))
+        return rows
+
+    def fetchmany(self, size):
+        rows = self._cursor.fetchmany(size)
+        self._fetched(len(rows))
+        return rows
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+
+def create_backend(config, root_path):
+    """Backend chosen by config['DB_BACKEND']: 'mysql' (default) or 'sqlite'."""
+    if config.get("DB_BACKEND", "mysql") == "sqlite":
+        return SQLiteBackend(os.path.join(root_path, config["SQLITE_PATH"]),
+                             os.path.join(root_path, config["SQLITE_SCHEMA"]))
+    return MySQLBackend(config["MYSQL_HOST"], config["MYSQL_USER"], config["MYSQL_PASSWORD"],
+                        config["MYSQL_DB"], config.get("MYSQL_PORT", 3306))
@@ -1,11 +1,18 @@
-from flask_mysqldb import MySQL
+import os
+from database import Database, create_backend
 
 def init_db(app):
+    # DB_BACKEND=sqlite runs the app without a MySQL server, on a file built from role_based_access.sql
+    app.config['DB_BACKEND'] = os.environ.get('DB_BACKEND', 'mysql')
     app.config['MYSQL_HOST'] = 'localhost'
     app.config['MYSQL_USER'] = 'root'
     app.config['MYSQL_PASSWORD'] = ''  # No password for XAMPP MySQL
     app.config['MYSQL_DB'] = 'role_based_access'
-    app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
+    app.config['SQLITE_PATH'] = os.environ.get('SQLITE_PATH', 'role_based_access.sqlite3')
+    app.config['SQLITE_SCHEMA'] = 'role_based_access.sql'
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 10))
+    app.config['DB_POOL_TIMEOUT'] = 5.0  # Seconds to wait for a free connection
 
 
-    return MySQL(app)
+    return Database(create_backend(app.config, app.root_path), app.config['DB_POOL_SIZE'],
+                    app.config['DB_POOL_TIMEOUT'])
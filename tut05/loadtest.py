@@ -0,0 +1,238 @@
+"""Load-test every route of app.py in process, against the SQLite backend.
+
+    python loadtest.py [--requests N] [--threads T] [--pool-size P] [--with-page-cache]
+    python loadtest.py --pagination [--rows 1000,1000000] [--full-max-rows N] [--with-page-cache]
+    python loadtest.py --bulk [--bulk-rows N] [--batch-sizes 100,1000]
+    python loadtest.py --page-cache
+
+Each thread logs in with its own test client and requests the routes in
+turn. Prints latency per route, database round trips per request, pool
+acquire times and saturation, and the user cache hit rate. The page cache
+is off unless --with-page-cache is given, so the database path is measured.
+
+--pagination fills stud_info with 1K to 1M rows and compares view_data's
+keyset pages (time to first byte, total time, peak memory) with rendering
+the whole table, as view_data used to.
+
+--bulk updates the same rows one POST /edit_data at a time and through
+POST /import_data (CSV) at several batch sizes, and prints rows/s.
+
+--page-cache checks that repeat visits to view_data get a 304 without
+touching the database, and that an edit changes the page immediately.
+"""
+import io
+import os
+import sys
+import time
+import tracemalloc
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+
+ROUTES = ['/dashboard', '/view_data', '/edit_data', '/assign_role']
+PASSWORD = 'loadtest-password'
+
+
+def create_app(pool_size, page_cache=True):
+    """Import app.py configured for a fresh SQLite database built from role_based_access.sql."""
+    tmpdir = tempfile.mkdtemp()
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = os.path.join(tmpdir, 'role_based_access.sqlite3')
+    os.environ['DB_POOL_SIZE'] = str(pool_size)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import app as application
+    if not page_cache:
+        application.page_cache.max_size = 0
+    return application
+
+
+def login(application, username):
+    from werkzeug.security import generate_password_hash
+    application.db.execute("INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
+                           (username, generate_password_hash(PASSWORD), 'admin'))
+    client = application.app.test_client()
+    response = client.post('/login', data={'username': username, 'password': PASSWORD})
+    assert response.status_code == 302, f"login failed for {username}"
+    return client
+
+
+def run(requests=2000, threads=4, pool_size=4, routes=ROUTES, page_cache=False):
+    application = create_app(pool_size, page_cache)
+    clients = [login(application, f'loadtest{t}') for t in range(threads)]
+    application.user_cache.hits = application.user_cache.misses = 0
+    queries_before = application.db.queries
+    timings = defaultdict(list)
+    lock = threading.Lock()
+
+    def worker(client):
+        local = defaultdict(list)
+        for i in range(requests // threads):
+            route = routes[i % len(routes)]
+            start = time.perf_counter()
+            response = client.get(route)
+            response.get_data()  # Read the body, as a browser would
+            local[route].append(time.perf_counter() - start)
+            assert response.status_code == 200, (route, response.status_code)
+        with lock:
+            for route, values in local.items():
+                timings[route].extend(values)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    total = sum(len(values) for values in timings.values())
+    print(f"{total} requests on {threads} threads in {seconds:.2f} s ({total / seconds:,.0f} req/s)")
+    for route in routes:
+        values = sorted(timings[route])
+        print(f"  {route:<14} mean {sum(values) / len(values) * 1e3:7.2f} ms, "
+              f"p95 {values[int(len(values) * 0.95)] * 1e3:7.2f} ms")
+    print(f"DB round trips per request: {(application.db.queries - queries_before) / total:.2f}")
+    pool_stats = application.db.pool.stats()
+    print(f"Pool: {pool_stats['created']}/{pool_stats['max_size']} connections, "
+          f"acquire mean {pool_stats['mean_acquire_us']:.1f} us, max {pool_stats['max_acquire_us']:.1f} us, "
+          f"waited {pool_stats['waits']} of {pool_stats['acquires']} times, {pool_stats['timeouts']} timeouts")
+    cache = application.user_cache.stats()
+    print(f"User cache: {cache['hits']} hits, {cache['misses']} misses ({cache['hit_rate']:.1%})")
+    pages = application.page_cache.stats()
+    print(f"Page cache: {pages['hits']} hits, {pages['not_modified']} not modified, {pages['misses']} misses "
+          f"({pages['hit_rate']:.1%})")
+
+
+def populate_students(application, rows, batch=10_000):
+    with application.db.transaction() as cur:
+        cur.execute("DELETE FROM stud_info")
+        for start in range(0, rows, batch):
+            cur.executemany("INSERT INTO stud_info (roll, name, age, branch, hometown) VALUES (%s, %s, %s, %s, %s)",
+                            [(100_000 + i, f'Student {i}', 18 + i % 7, 'Computer Science', 'Patna')
+                             for i in range(start, min(start + batch, rows))])
+    application.page_cache.bump('stud_info')
+
+
+def measure(produce):
+    """Seconds to the first chunk and to the last, then peak traced bytes (from a second, traced run)."""
+    start = time.perf_counter()
+    chunks = iter(produce())
+    next(chunks, None)
+    first = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    total = time.perf_counter() - start
+
+    tracemalloc.start()
+    for _ in produce():
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first, total, peak
+
+
+def benchmark_pagination(sizes=(1_000, 10_000, 100_000, 1_000_000), full_max_rows=100_000, page_cache=False):
+    application = create_app(4, page_cache)
+    client = login(application, 'pagination')
+
+    def page(url):
+        def produce():
+            response = client.get(url, buffered=False)
+            assert response.status_code == 200
+            return response.response
+        return produce
+
+    def full_table():
+        # What view_data did before pagination: every column of every row, rendered in one string
+        with application.app.test_request_context():
+            students = application.db.query("SELECT * FROM stud_info")
+            return [application.render_template('view_data.html', students=students, page_size=0,
+                                                prev_roll=None, next_roll=None)]
+
+    for rows in sizes:
+        populate_students(application, rows)
+        cases = [('first page', page('/view_data')),
+                 ('middle page', page(f'/view_data?after={100_000 + rows // 2}'))]
+        if rows <= full_max_rows:
+            cases.append(('whole table', full_table))
+        for label, produce in cases:
+            first, total, peak = measure(produce)
+            print(f"{rows:>9,} rows, {label:<12}: first byte {first * 1e3:8.2f} ms, "
+                  f"total {total * 1e3:9.2f} ms, peak {peak / 2**20:8.2f} MB")
+
+
+def benchmark_bulk(rows=5_000, batch_sizes=(100, 1_000, 10_000)):
+    application = create_app(4)
+    client = login(application, 'bulk')
+    populate_students(application, rows)
+    students = [{'roll': 100_000 + i, 'name': f'Renamed {i}', 'age': 20, 'branch': 'Mathematics',
+                 'hometown': 'Delhi'} for i in range(rows)]
+
+    start = time.perf_counter()
+    for student in students:
+        response = client.post('/edit_data', data=student)
+        assert response.status_code == 302
+    seconds = time.perf_counter() - start
+    print(f"edit_data, one row per POST:   {rows / seconds:10,.0f} rows/s")
+
+    csv_text = 'roll,name,age,branch,hometown\n' + ''.join(
+        f"{s['roll']},{s['name']},{s['age']},{s['branch']},{s['hometown']}\n" for s in students)
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        response = client.post('/import_data', data={
+            'file': (io.BytesIO(csv_text.encode()), 'students.csv'), 'batch_size': str(batch_size)})
+        assert response.status_code == 200
+        seconds = time.perf_counter() - start
+        print(f"import_data, batches of {batch_size:>6}: {rows / seconds:10,.0f} rows/s")
+
+
+def check_page_cache():
+    application = create_app(2)
+    application.page_cache.ttl = 3600  # A ttl window ending mid-check would change the ETag
+    client = login(application, 'pagecache')
+
+    first = client.get('/view_data')
+    body, etag = first.get_data(), first.headers['ETag']
+    queries = application.db.queries
+    revalidated = client.get('/view_data', headers={'If-None-Match': etag})
+    repeated = client.get('/view_data')
+    print(f"Repeat visit with ETag: {revalidated.status_code}, without: {repeated.status_code} "
+          f"(same body: {repeated.get_data() == body}), database queries: {application.db.queries - queries}")
+    assert revalidated.status_code == 304 and repeated.get_data() == body
+    assert application.db.queries == queries
+
+    client.post('/edit_data', data={'roll': 101, 'name': 'Edited Name', 'age': 20, 'branch': 'Physics',
+                                    'hometown': 'Pune'})
+    after = client.get('/view_data', headers={'If-None-Match': etag})
+    print(f"After edit_data with the old ETag: {after.status_code}, "
+          f"shows the edit: {b'Edited Name' in after.get_data()}")
+    assert after.status_code == 200 and b'Edited Name' in after.get_data()
+    print(f"Page cache: {application.page_cache.stats()}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--pool-size', type=int, default=4)
+    parser.add_argument('--pagination', action='store_true', help='benchmark view_data pages as the table grows')
+    parser.add_argument('--rows', default='1000,10000,100000,1000000', help='comma-separated table sizes')
+    parser.add_argument('--full-max-rows', type=int, default=100_000,
+                        help='largest table to also render whole, for comparison')
+    parser.add_argument('--bulk', action='store_true', help='benchmark import_data against single-row edit_data')
+    parser.add_argument('--bulk-rows', type=int, default=5_000)
+    parser.add_argument('--batch-sizes', default='100,1000,10000', help='comma-separated rows per transaction')
+    parser.add_argument('--page-cache', action='store_true', help='check conditional GETs and invalidation')
+    parser.add_argument('--with-page-cache', action='store_true',
+                        help='keep the page cache on in the load test and pagination benchmark')
+    args = parser.parse_args()
+    if args.page_cache:
+        check_page_cache()
+    elif args.bulk:
+        benchmark_bulk(args.bulk_rows, [int(size) for size in args.batch_sizes.split(',')])
+    elif args.pagination:
+        benchmark_pagination([int(rows) for rows in args.rows.split(',')], args.full_max_rows,
+                             args.with_page_cache)
+    else:
+        run(args.requests, args.threads, args.pool_size, page_cache=args.with_page_cache)
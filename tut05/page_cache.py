@@ -0,0 +1,153 @@
+import os
+import time
+import hashlib
+import threading
+from functools import wraps
+from collections import OrderedDict
+from email.utils import formatdate
+
+
+class PageCache:
+    """Rendered GET responses keyed by route, role and the versions of the tables they read.
+
+    Views declare the tables they depend on; anything that writes a table
+    calls bump(table), which changes the key of every page built from it, so
+    stale entries are never served again (they age out of the LRU). Because
+    the key needs no database access, a request whose If-None-Match matches
+    gets a 304 before the view runs: no query and no template rendering.
+    Versions live in this process; the ETag includes a per-process random
+    epoch so tags from before a restart never match. Writes this process
+    does not see (another app process, phpMyAdmin) are caught by the ttl:
+    the key also holds the current ttl-second window, so every page and
+    ETag is rebuilt at least once per window.
+    """
+
+    def __init__(self, max_size=256, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._epoch = os.urandom(8).hex()
+        self._versions = {}  # table -> version number
+        self._modified = {}  # table -> time of last bump
+        self._started = time.time()
+        self._entries = OrderedDict()  # etag -> body
+        self._lock = threading.Lock()
+
+    def bump(self, table):
+        """Mark a table as changed; pages built from it are rebuilt on their next request."""
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+            self._modified[table] = time.time()
+
+    def _window(self):
+        """Start time of the current ttl window (0 without a ttl)."""
+        return time.time() // self.ttl * self.ttl if self.ttl else 0
+
+    def etag(self, route, role, tables, user=None):
+        with self._lock:
+            versions = ",".join(f"{table}:{self._versions.get(table, 0)}" for table in tables)
+        key = f"{self._epoch}|{self._window()}|{route}|{role}|{user}|{versions}"
+        return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+    def last_modified(self, tables):
+        with self._lock:
+            return max([self._started, self._window()] + [self._modified.get(table, 0) for table in tables])
+
+    def get(self, etag):
+        with self._lock:
+            body = self._entries.get(etag)
+            if body is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(etag)
+                self.hits += 1
+            return body
+
+    def put(self, etag, body):
+        with self._lock:
+            self._entries[etag] = body
+            self._entries.move_to_end(etag)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            requests = self.hits + self.misses + self.not_modified
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "not_modified": self.not_modified,
+                    "hit_rate": (self.hits + self.not_modified) / requests if requests else 0.0}
+
+    def cached(self, *tables, per_user=False, shows_flashes=False):
+        """Decorator for a GET view whose output depends only on the route, the user's role and tables.
+
+        per_user=True also keys on the user id, for pages that show the
+        user's own details; those get an ETag only, since no Last-Modified
+        date can tell one user's page from another's. Other pages take
+        Last-Modified from their tables and from users, whose bumps mark
+        role changes. Pages whose template shows flashed messages pass
+        shows_flashes=True and bypass the cache while a message is waiting.
+        Only 200 responses are stored. A cache with max_size 0 is off: views
+        run on every request and no validators are sent.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                from flask import request, session, make_response
+                from flask_login import current_user
+
+                if (self.max_size == 0 or request.method != 'GET'
+                        or (shows_flashes and session.get('_flashes'))):
+                    return view(*args, **kwargs)
+                etag = self.etag(request.full_path, current_user.role, tables,
+                                 current_user.get_id() if per_user else None)
+                modified = None if per_user else self.last_modified(tables + ('users',))
+                if conditional_match(request, etag, modified):
+                    with self._lock:
+                        self.not_modified += 1
+                    response = make_response('', 304)
+                    return with_validators(response, etag, modified)
+
+                body = self.get(etag)
+                if body is not None:
+                    return with_validators(make_response(body), etag, modified)
+
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200:
+                    response.response = self._recording(etag, response.response)
+                    with_validators(response, etag, modified)
+                return response
+            return wrapper
+        return decorator
+
+    def _recording(self, etag, chunks):
+        """Pass a (possibly streamed) body through, storing it once it has been sent completely."""
+        parts = []
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            parts.append(chunk)
+            yield chunk
+        self.put(etag, b''.join(parts))
+
+
+def conditional_match(request, etag, modified):
+    """True if the client's copy is current. If-None-Match wins over If-Modified-Since, as in RFC 9110.
+
+    modified is None for pages sent without Last-Modified; only the ETag can match them.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if request.if_modified_since and modified is not None:
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+def with_validators(response, etag, modified):
+    response.set_etag(etag)
+    if modified is not None:
+        response.headers['Last-Modified'] = formatdate(modified, usegmt=True)
+    # Pages are per role (or user): browsers may keep them but must revalidate, shared caches must not
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,112 @@
+import csv
+import json
+import time
+
+FIELDS = ("roll", "name", "age", "branch", "hometown")
+# Column -> maximum length, as declared in role_based_access.sql
+TEXT_LIMITS = {"name": 100, "branch": 50, "hometown": 100}
+UPDATE_STUDENT = "UPDATE stud_info SET name=%s, age=%s, branch=%s, hometown=%s WHERE roll=%s"
+MAX_REPORTED_REJECTIONS = 100
+LOOKUP_CHUNK = 500  # Rolls per IN (...) list, below every backend's parameter limit
+
+
+def validate_row(row):
+    """Parameters for UPDATE_STUDENT from a dict of strings or values; raises ValueError naming the problem."""
+    missing = [field for field in FIELDS if row.get(field) in (None, "")]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    try:
+        roll = int(row["roll"])
+    except (TypeError, ValueError):
+        raise ValueError(f"roll is not a number: {row['roll']!r}") from None
+    try:
+        age = int(row["age"])
+    except (TypeError, ValueError):
+        raise ValueError(f"age is not a number: {row['age']!r}") from None
+    if not 0 < age < 150:
+        raise ValueError(f"age out of range: {age}")
+    values = {}
+    for field, limit in TEXT_LIMITS.items():
+        value = str(row[field]).strip()
+        if len(value) > limit:
+            raise ValueError(f"{field} longer than {limit} characters")
+        values[field] = value
+    return (values["name"], age, values["branch"], values["hometown"], roll)
+
+
+def read_rows(stream, filename=""):
+    """(line number, row dict) pairs from a CSV file with a header, or a JSON array of objects.
+
+    CSV is read lazily; JSON is parsed whole (the standard library has no
+    incremental parser), then walked the same way.
+    """
+    if filename.lower().endswith(".json"):
+        data = json.load(stream)
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be an array of student objects")
+        for number, row in enumerate(data, 1):
+            yield number, row if isinstance(row, dict) else {}
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def bulk_update_students(db, rows, batch_size=1000):
+    """Validate (line number, row) pairs in one pass and apply them with executemany, batch by batch.
+
+    Each batch of batch_size valid rows is one transaction. Rows whose roll
+    matches no student are rejected too, found with one lookup per batch.
+    Returns a report: rows updated, per-batch sizes and timings, and the
+    rejected rows with their reasons (the first MAX_REPORTED_REJECTIONS of
+    them).
+    """
+    report = {"updated": 0, "batches": [], "rejected": 0, "rejections": []}
+
+    def reject(number, error):
+        report["rejected"] += 1
+        if len(report["rejections"]) < MAX_REPORTED_REJECTIONS:
+            report["rejections"].append({"line": number, "error": error})
+
+    def flush(batch):
+        start = time.perf_counter()
+        with db.transaction() as cur:
+            found = existing_rolls(cur, {params[-1] for _, params in batch})
+            matched = []
+            for number, params in batch:
+                if params[-1] in found:
+                    matched.append(params)
+                else:
+                    reject(number, f"no student with roll {params[-1]}")
+            updated = 0
+            if matched:
+                cur.executemany(UPDATE_STUDENT, matched)
+                updated = cur.rowcount
+        report["updated"] += updated
+        report["batches"].append({"rows": len(batch), "updated": updated,
+                                  "seconds": round(time.perf_counter() - start, 6)})
+
+    batch = []
+    for number, row in rows:
+        try:
+            batch.append((number, validate_row(row)))
+        except ValueError as e:
+            reject(number, str(e))
+            continue
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    return report
+
+
+def existing_rolls(cur, rolls):
+    """The subset of rolls present in stud_info."""
+    rolls = sorted(rolls)
+    found = set()
+    for start in range(0, len(rolls), LOOKUP_CHUNK):
+        chunk = rolls[start:start + LOOKUP_CHUNK]
+        cur.execute(f"SELECT roll FROM stud_info WHERE roll IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        found.update(row["roll"] for row in cur.fetchall())
+    return found
@@ -0,0 +1,60 @@
+import time
+import threading
+from collections import OrderedDict
+
+
+class UserCache:
+    """LRU cache of User objects by id, with a time-to-live.
+
+    load_user hits the users table on every authenticated request; this keeps
+    recently seen users in memory instead. Entries expire after ttl seconds,
+    the least recently used entry is dropped beyond max_size, and anything
+    that changes a user must call invalidate() with its id so the change is
+    visible on the next request.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # id -> (expires_at, user)
+        self._lock = threading.Lock()
+
+    def get(self, user_id, load):
+        """Cached user for user_id, calling load(user_id) on a miss (None results are not cached)."""
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        user = load(user_id)
+        if user is not None:
+            self.put(user)
+        return user
+
+    def put(self, user):
+        key = user.get_id()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}